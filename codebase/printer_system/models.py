@@ -11,24 +11,46 @@ Do not add new model classes here - put them in `tickets/models.py` instead.
 """
 
 from tickets.models import (
+    ConsumableCompatibility,
+    FleetHealth,
     InventoryItem,
+    InventoryScanReceipt,
+    InventoryTransaction,
     IssueSummaryRecipient,
     IssueSummaryState,
+    OutboxEmail,
+    PollLease,
     Printer,
     PrinterComment,
+    PrinterCondition,
     PrinterGroup,
+    PrinterStateInterval,
     PrinterStatus,
     RequestTicket,
+    SupplyLevelSample,
+    SupplyLine,
+    SupplyReading,
 )
 
 __all__ = [
+    "ConsumableCompatibility",
+    "FleetHealth",
     "InventoryItem",
+    "InventoryScanReceipt",
+    "InventoryTransaction",
     "IssueSummaryRecipient",
     "IssueSummaryState",
+    "OutboxEmail",
+    "PollLease",
     "Printer",
     "PrinterComment",
+    "PrinterCondition",
     "PrinterGroup",
+    "PrinterStateInterval",
     "PrinterStatus",
     "RequestTicket",
+    "SupplyLevelSample",
+    "SupplyLine",
+    "SupplyReading",
 ]
 
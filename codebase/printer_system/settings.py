@@ -196,6 +196,13 @@ DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "no-reply@berea.local")
 
 # Comma-separated list to Python list
 EMAIL_TO = [e.strip() for e in os.getenv("EMAIL_TO", "").split(",") if e.strip()]
+# Ticket notification outbox (tickets.outbox)
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+# Background mail worker pool (tickets.mail_worker)
+MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", "2"))
+MAIL_QUEUE_LIMIT = int(os.getenv("MAIL_QUEUE_LIMIT", "100"))
+MAIL_SEND_TIMEOUT_SECONDS = int(os.getenv("MAIL_SEND_TIMEOUT_SECONDS", "20"))
 
 
 
@@ -226,6 +233,46 @@ SNMP_COMMUNITY = os.getenv("SNMP_COMMUNITY", "public")
 SNMP_TIMEOUT = int(os.getenv("SNMP_TIMEOUT", "5"))
 SNMP_RETRIES = int(os.getenv("SNMP_RETRIES", "1"))
 SNMP_POLL_INTERVAL_SECONDS = int(os.getenv("SNMP_POLL_INTERVAL_SECONDS", "300"))
+# Concurrent polls per process and how long the manager feed waits for them
+SNMP_REFRESH_WORKERS = int(os.getenv("SNMP_REFRESH_WORKERS", "8"))
+# How long a poller holds a printer's PollLease before others may poll it
+SNMP_POLL_LEASE_SECONDS = int(os.getenv("SNMP_POLL_LEASE_SECONDS", "60"))
+STATUS_FEED_BUDGET_SECONDS = float(os.getenv("STATUS_FEED_BUDGET_SECONDS", "3"))
+# Supply percentage at or below which a consumable is reported as low.
+SUPPLY_LOW_PERCENT = int(os.getenv("SUPPLY_LOW_PERCENT", "10"))
+# Supply history / depletion forecasting (tickets.forecasting)
+SUPPLY_SAMPLE_INTERVAL_HOURS = int(os.getenv("SUPPLY_SAMPLE_INTERVAL_HOURS", "6"))
+SUPPLY_FORECAST_WINDOW_DAYS = int(os.getenv("SUPPLY_FORECAST_WINDOW_DAYS", "30"))
+# Suggested inventory reorder thresholds from the stock ledger (tickets.reorder)
+REORDER_WINDOW_DAYS = int(os.getenv("REORDER_WINDOW_DAYS", "90"))
+REORDER_LEAD_TIME_DAYS = float(os.getenv("REORDER_LEAD_TIME_DAYS", "7"))
+REORDER_SERVICE_Z = float(os.getenv("REORDER_SERVICE_Z", "1.65"))
+# Automatic SUPPLY tickets when a reading drops to SUPPLY_LOW_PERCENT (tickets.auto_tickets)
+AUTO_SUPPLY_TICKETS = os.getenv("AUTO_SUPPLY_TICKETS", "false").lower() == "true"
+AUTO_SUPPLY_TICKET_SCOPE = os.getenv("AUTO_SUPPLY_TICKET_SCOPE", "printer").strip().lower()  # 'printer' or 'group'
+# Automatic ISSUE tickets for jams/door open/offline/etc. seen on this many consecutive polls
+AUTO_ISSUE_TICKETS = os.getenv("AUTO_ISSUE_TICKETS", "false").lower() == "true"
+AUTO_ISSUE_TICKET_POLLS = int(os.getenv("AUTO_ISSUE_TICKET_POLLS", "3"))
+# Issue report rate limits as "count/seconds" (0 disables a scope; tickets.rate_limits)
+ISSUE_RATE_LIMIT_PER_PRINTER = os.getenv("ISSUE_RATE_LIMIT_PER_PRINTER", "3/3600")
+ISSUE_RATE_LIMIT_PER_IP = os.getenv("ISSUE_RATE_LIMIT_PER_IP", "10/3600")
+ISSUE_RATE_LIMIT_PER_EMAIL = os.getenv("ISSUE_RATE_LIMIT_PER_EMAIL", "5/3600")
+# Comma-separated reverse proxy addresses whose X-Forwarded-For is trusted for the per-IP limit
+RATE_LIMIT_TRUSTED_PROXIES = [
+    v.strip() for v in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if v.strip()
+]
+# Seconds a manager's cached managed group/printer ids are kept (tickets.permissions; 0 disables).
+# Invalidation only reaches other processes through a shared CACHES backend.
+MANAGER_PERMISSION_CACHE_SECONDS = int(os.getenv("MANAGER_PERMISSION_CACHE_SECONDS", "30"))
+# Seconds the printer -> compatible inventory lookup is cached (tickets.compatibility; 0 disables)
+COMPATIBILITY_CACHE_SECONDS = int(os.getenv("COMPATIBILITY_CACHE_SECONDS", "3600"))
+# Seconds the public QR portal page is cached for anonymous visitors (0 disables)
+PORTAL_CACHE_SECONDS = int(os.getenv("PORTAL_CACHE_SECONDS", "600"))
+# Manager dashboard live stream (tickets.status_events)
+STATUS_STREAM_CHECK_SECONDS = int(os.getenv("STATUS_STREAM_CHECK_SECONDS", "15"))
+STATUS_STREAM_MAX_SECONDS = int(os.getenv("STATUS_STREAM_MAX_SECONDS", "600"))
+# Open streams per process; keep well below the waitress thread count (0 disables streams)
+STATUS_STREAM_MAX_CONNECTIONS = int(os.getenv("STATUS_STREAM_MAX_CONNECTIONS", "4"))
 
 
 
@@ -9,9 +9,13 @@ from tickets.views import (
     manager_printer_issue,
     manager_printer_order,
     manager_status_feed,
+    manager_status_stream,
+    manager_supply_forecast,
+    manager_availability,
     manager_printer_status,
     inventory_scanner,
     inventory_scan,
+    inventory_scan_batch,
     printer_issue,
     printer_order,
     printer_paper_order,
@@ -26,6 +30,9 @@ urlpatterns = [
     path('manager/groups/<int:group_id>/order/', manager_group_order, name='manager_group_order'),
     path('manager/groups/<int:group_id>/quick-paper/', manager_group_quick_paper, name='manager_group_quick_paper'),
     path('manager/status/', manager_status_feed, name='manager_status_feed'),
+    path('manager/status/stream/', manager_status_stream, name='manager_status_stream'),
+    path('manager/forecast/', manager_supply_forecast, name='manager_supply_forecast'),
+    path('manager/availability/', manager_availability, name='manager_availability'),
     path('manager/printers/<int:printer_id>/order/', manager_printer_order, name='manager_printer_order'),
     path('manager/printers/<int:printer_id>/status/', manager_printer_status, name='manager_printer_status'),
     path('manager/printers/<int:printer_id>/issue/', manager_printer_issue, name='manager_printer_issue'),
@@ -37,4 +44,5 @@ urlpatterns = [
     # Inventory scanner
     path('scanner/', inventory_scanner, name='inventory_scanner'),
     path('scanner/scan/', inventory_scan, name='inventory_scan'),
+    path('scanner/scan/batch/', inventory_scan_batch, name='inventory_scan_batch'),
 ]
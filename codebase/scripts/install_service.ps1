@@ -2,6 +2,7 @@ param(
   [string]$ServiceName = "printer-system",
   [string]$RepoPath,
   [int]$Port = 8000,
+  [int]$Threads = 16,
   [string]$NssmPath,
   [string]$DisplayName = ""
 )
@@ -35,7 +36,9 @@ $nssm = Find-Nssm -Explicit $NssmPath
 $exe  = Join-Path $RepoPath '.venv\Scripts\waitress-serve.exe'
 if (-not (Test-Path $exe)) { throw "App server not found: $exe. Create the venv and install requirements first." }
 
-$args = "--listen=0.0.0.0:$Port printer_system.wsgi:application"
+# Dashboard live-update streams each hold a thread (STATUS_STREAM_MAX_CONNECTIONS,
+# default 4), so run more than waitress's default 4 threads.
+$args = "--listen=0.0.0.0:$Port --threads=$Threads printer_system.wsgi:application"
 
 # Ensure data/ exists for logs
 $dataDir = Join-Path $RepoPath 'data'
@@ -3,7 +3,10 @@ param(
   [string]$ServiceName = "printer-system-dev",
   [int]$Port = 8000,
   [string]$SummaryTime = "07:00",   # 24h format HH:MM local time
+  [string]$ReorderTime = "02:00",   # 24h format HH:MM local time
   [int]$PrewarmEveryMinutes = 30,
+  [int]$ForecastEveryMinutes = 240,
+  [int]$OutboxEveryMinutes = 5,
   [switch]$AsSystem = $false
 )
 
@@ -49,5 +52,31 @@ $preAction = New-ScheduledTaskAction -Execute $py -Argument "manage.py prewarm_s
 Write-Step "Registering task: $preName every $PrewarmEveryMinutes min (starts $($start.ToShortTimeString()))"
 Register-ScheduledTask -TaskName $preName -Action $preAction -Trigger $preTrigger -Description "Prewarm SNMP status cache" -RunLevel Highest @((New-TaskUserParam -AsSystem:$AsSystem)) | Out-Null
 
-Write-Host "Scheduled tasks created: `n - $sumName `n - $preName" -ForegroundColor Green
+# --- Supply forecast task (repeating) ---
+$fcName = "$ServiceName - Supply Forecast"
+$fcStart = (Get-Date).AddMinutes(5)
+$fcInterval = New-TimeSpan -Minutes $ForecastEveryMinutes
+$fcTrigger = New-ScheduledTaskTrigger -Once -At $fcStart -RepetitionInterval $fcInterval -RepetitionDuration $duration
+$fcAction = New-ScheduledTaskAction -Execute $py -Argument "manage.py forecast_supplies" -WorkingDirectory $repo
+Write-Step "Registering task: $fcName every $ForecastEveryMinutes min (starts $($fcStart.ToShortTimeString()))"
+Register-ScheduledTask -TaskName $fcName -Action $fcAction -Trigger $fcTrigger -Description "Forecast supply depletion" -RunLevel Highest @((New-TaskUserParam -AsSystem:$AsSystem)) | Out-Null
+
+# --- Reorder threshold suggestions (daily) ---
+$roName = "$ServiceName - Reorder Suggestions"
+$roTime = [DateTime]::Parse($ReorderTime)
+$roTrigger = New-ScheduledTaskTrigger -Daily -At $roTime.TimeOfDay
+$roAction = New-ScheduledTaskAction -Execute $py -Argument "manage.py suggest_reorder_thresholds" -WorkingDirectory $repo
+Write-Step "Registering task: $roName at $ReorderTime"
+Register-ScheduledTask -TaskName $roName -Action $roAction -Trigger $roTrigger -Description "Suggest inventory reorder thresholds" -RunLevel Highest @((New-TaskUserParam -AsSystem:$AsSystem)) | Out-Null
+
+# --- Email outbox retry task (repeating) ---
+$obName = "$ServiceName - Email Outbox"
+$obStart = (Get-Date).AddMinutes(2)
+$obInterval = New-TimeSpan -Minutes $OutboxEveryMinutes
+$obTrigger = New-ScheduledTaskTrigger -Once -At $obStart -RepetitionInterval $obInterval -RepetitionDuration $duration
+$obAction = New-ScheduledTaskAction -Execute $py -Argument "manage.py deliver_outbox" -WorkingDirectory $repo
+Write-Step "Registering task: $obName every $OutboxEveryMinutes min (starts $($obStart.ToShortTimeString()))"
+Register-ScheduledTask -TaskName $obName -Action $obAction -Trigger $obTrigger -Description "Deliver queued ticket emails" -RunLevel Highest @((New-TaskUserParam -AsSystem:$AsSystem)) | Out-Null
+
+Write-Host "Scheduled tasks created: `n - $sumName `n - $preName `n - $fcName `n - $roName `n - $obName" -ForegroundColor Green
 
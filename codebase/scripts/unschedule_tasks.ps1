@@ -12,7 +12,13 @@ function Remove-IfExists([string]$name){
 
 $sumName = "$ServiceName - Daily Summary"
 $preName = "$ServiceName - Prewarm Status"
+$fcName = "$ServiceName - Supply Forecast"
+$roName = "$ServiceName - Reorder Suggestions"
+$obName = "$ServiceName - Email Outbox"
 Remove-IfExists -name $sumName
 Remove-IfExists -name $preName
+Remove-IfExists -name $fcName
+Remove-IfExists -name $roName
+Remove-IfExists -name $obName
 Write-Host "Done."
 
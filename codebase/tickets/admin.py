@@ -1,27 +1,42 @@
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
-from django.db import models
+from django.db import models, transaction
 # Custom admin index view to inject low inventory notifications
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
 from django.urls import path, reverse
 from django.template.response import TemplateResponse
-from django.http import Http404, HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse
+from django.utils import timezone
 from django.utils.safestring import mark_safe
 import io
+from datetime import date, datetime, time, timedelta
 import json
 import csv
 from .printer_status import POLL_INTERVAL_SECONDS, ensure_latest_status, build_status_payload
-from .forms import InventoryItemAdminForm
+from .supplies import LOW_SUPPLY_PERCENT, low_supply_readings
+from .fleet_health import fleet_health, refresh_fleet_health_for_printers
+from .outbox import kick_delivery
+from .reservations import can_change_status, release_lines, reserve_supply_lines, settle_for_status
+from .inventory import REPORT_GROUPS, REPORT_PERIODS, consumption_report
+from .pick_list import build_pick_list
+from .forms import InventoryItemAdminForm, RequestTicketAdminForm
 from .models import (
+    ConsumableCompatibility,
     InventoryItem,
+    InventoryTransaction,
     IssueSummaryRecipient,
+    OutboxEmail,
     Printer,
     PrinterComment,
+    PrinterCondition,
     PrinterGroup,
     PrinterStatus,
     RequestTicket,
+    SHELF_ORDER,
+    SupplyLine,
+    SupplyReading,
 )
 # Inline for PrinterComment
 User = get_user_model()
@@ -113,7 +128,9 @@ class CustomAdminSite(admin.AdminSite):
         resp['Cache-Control'] = 'no-store'
         return resp
     def index(self, request, extra_context=None):
-        low_inventory_items = InventoryItem.objects.filter(quantity_on_hand__lte=models.F('reorder_threshold'))
+        low_inventory_items = InventoryItem.objects.filter(
+            quantity_on_hand__lte=models.F('reorder_threshold') + models.F('quantity_reserved')
+        )
         # Missing data summary for printers
         generic_values = {
             'mac_address': 'UNKNOWN-MACADDRESS',
@@ -135,11 +152,14 @@ class CustomAdminSite(admin.AdminSite):
         status_qs = PrinterStatus.objects.select_related('printer').filter(
             models.Q(attention=True) | models.Q(snmp_ok=False)
         ).order_by('printer__campus_label')
-        alert_total = status_qs.count()
         printer_status_alerts = list(status_qs[:20])
+        # Totals come from the precomputed fleet-wide FleetHealth row
+        health, _ = fleet_health()
+        alert_total = health.alert_count
         alert_overflow = max(alert_total - len(printer_status_alerts), 0)
-        attention_total = PrinterStatus.objects.filter(attention=True).count()
-        snmp_fault_total = PrinterStatus.objects.filter(snmp_ok=False).count()
+        attention_total = health.attention_count
+        snmp_fault_total = health.fault_count
+        low_supplies = list(low_supply_readings()[:20])
 
         if extra_context is None:
             extra_context = {}
@@ -151,7 +171,11 @@ class CustomAdminSite(admin.AdminSite):
         extra_context['printer_status_summary'] = {
             'attention_total': attention_total,
             'snmp_fault_total': snmp_fault_total,
+            'low_supply_total': health.low_supply_count,
+            'open_issue_total': health.open_issue_count,
         }
+        extra_context['low_supply_readings'] = low_supplies
+        extra_context['low_supply_percent'] = LOW_SUPPLY_PERCENT
         return super().index(request, extra_context=extra_context)
 
 # Swap out the default admin site for the custom one
@@ -160,20 +184,56 @@ admin.site.__class__ = CustomAdminSite
 class InventoryItemResource(resources.ModelResource):
     class Meta:
         model = InventoryItem
+        # Maintained by tickets.reservations / tickets.reorder, not by spreadsheets
+        exclude = (
+            'quantity_reserved', 'consumption_rate_per_day', 'consumption_stddev_per_day',
+            'suggested_reorder_threshold', 'reorder_suggested_at',
+        )
+
+
+class ConsumableCompatibilityInline(admin.TabularInline):
+    model = ConsumableCompatibility
+    extra = 1
+    fields = ('make', 'model_pattern')
 
 
 @admin.register(InventoryItem)
 class InventoryItemAdmin(ImportExportModelAdmin):
     form = InventoryItemAdminForm
-    autocomplete_fields = ('compatible_printers',)
+    autocomplete_fields = ('compatible_printers', 'excluded_printers')
+    inlines = [ConsumableCompatibilityInline]
     list_display = (
-        'name', 'category', 'quantity_on_hand', 'reorder_threshold', 'shelf_location', 'barcode',
+        'name', 'category', 'quantity_on_hand', 'quantity_reserved', 'available', 'reorder_threshold',
+        'suggested_reorder_threshold', 'consumption_rate_per_day', 'shelf_location', 'barcode',
     )
     list_filter = ('category', 'shelf_row')
     search_fields = ('name', 'model_number', 'shelf_row', 'barcode')
-    ordering = ('shelf_row', 'shelf_column', 'name')
-    readonly_fields = ('shelf_location', 'scanner_links')
+    ordering = SHELF_ORDER
+    readonly_fields = (
+        'shelf_location', 'scanner_links', 'quantity_reserved', 'consumption_rate_per_day',
+        'consumption_stddev_per_day', 'suggested_reorder_threshold', 'reorder_suggested_at',
+    )
     resource_class = InventoryItemResource
+    actions = ['apply_suggested_thresholds']
+
+    @admin.action(description="Apply suggested reorder thresholds")
+    def apply_suggested_thresholds(self, request, queryset):
+        updated = queryset.filter(suggested_reorder_threshold__isnull=False).update(
+            reorder_threshold=models.F('suggested_reorder_threshold')
+        )
+        self.message_user(request, f"Updated the reorder threshold of {updated} item(s).")
+
+    def available(self, obj):
+        return obj.quantity_available
+    available.short_description = 'Available'
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        # Reservations move with concurrent orders and suggestions with the
+        # nightly job; never write back the values this form was rendered with.
+        fields = [f.name for f in obj._meta.concrete_fields if not f.primary_key and f.name not in self.readonly_fields]
+        obj.save(update_fields=fields)
 
     def shelf_location(self, obj):
         return obj.shelf_code or '-'
@@ -299,6 +359,136 @@ class PrinterGroupAdmin(admin.ModelAdmin):
         return obj.printers.count()
 
 
+@admin.register(SupplyReading)
+class SupplyReadingAdmin(admin.ModelAdmin):
+    list_display = ('printer', 'description', 'kind', 'percent', 'depletion_rate_per_day', 'predicted_empty_at', 'updated_at')
+    list_filter = ('kind', 'printer__building', 'printer__group')
+    search_fields = ('description', 'printer__campus_label', 'printer__asset_tag')
+    ordering = ('percent', 'printer__campus_label')
+    list_select_related = ('printer',)
+    list_per_page = 50
+
+    # Rows are rewritten by the SNMP poller; keep the admin read-only.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PrinterCondition)
+class PrinterConditionAdmin(admin.ModelAdmin):
+    list_display = ('printer', 'label', 'consecutive_polls', 'first_seen_at', 'last_seen_at', 'ticket')
+    search_fields = ('code', 'label', 'printer__campus_label', 'printer__asset_tag')
+    ordering = ('-first_seen_at',)
+    list_select_related = ('printer', 'ticket')
+
+    # Maintained by the SNMP poller; rows disappear once a condition clears.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'last_error')
+    ordering = ('-created_at',)
+    readonly_fields = (
+        'subject', 'body', 'from_email', 'recipients', 'ticket', 'status', 'attempts',
+        'next_attempt_at', 'claim_token', 'last_error', 'created_at', 'sent_at',
+    )
+    actions = ['retry_now']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Retry now")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutboxEmail.SENT).update(
+            status=OutboxEmail.PENDING,
+            next_attempt_at=timezone.now(),
+            claim_token='',
+        )
+        kick_delivery()
+        self.message_user(request, f"Queued {updated} email(s) for delivery.")
+
+
+@admin.register(InventoryTransaction)
+class InventoryTransactionAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'item', 'delta', 'quantity_before', 'quantity_after', 'source', 'destination', 'ticket', 'user')
+    list_filter = ('source', 'created_at')
+    search_fields = ('item__name', 'item__barcode', 'destination')
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+    list_select_related = ('item', 'ticket', 'user')
+    change_list_template = 'admin/tickets/inventorytransaction/change_list.html'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom = [
+            path('report/', self.admin_site.admin_view(self.report_view), name='tickets_inventorytransaction_report'),
+        ]
+        return custom + urls
+
+    def report_view(self, request):
+        if not self.has_view_permission(request):
+            raise Http404
+        today = timezone.localdate()
+        start = _parse_report_date(request.GET.get('start')) or today - timedelta(days=90)
+        end = _parse_report_date(request.GET.get('end')) or today
+        group_by = request.GET.get('group_by') if request.GET.get('group_by') in REPORT_GROUPS else 'item'
+        period = request.GET.get('period') if request.GET.get('period') in REPORT_PERIODS else 'week'
+
+        tz = timezone.get_current_timezone()
+        rows = consumption_report(
+            datetime.combine(start, time.min, tzinfo=tz),
+            datetime.combine(end + timedelta(days=1), time.min, tzinfo=tz),
+            group_by=group_by,
+            period=period,
+        )
+        if request.GET.get('format') == 'csv':
+            resp = _csv_http_response(f"consumption_{start:%Y%m%d}_{end:%Y%m%d}")
+            writer = csv.writer(resp)
+            writer.writerow(['Period', 'Item' if group_by == 'item' else 'Destination', 'Quantity'])
+            for row in rows:
+                writer.writerow([row['period'].date().isoformat(), row['label'], row['quantity']])
+            return resp
+
+        ctx = {
+            **self.admin_site.each_context(request),
+            'title': 'Consumption report',
+            'opts': self.model._meta,
+            'rows': rows,
+            'total': sum(row['quantity'] for row in rows),
+            'start': start,
+            'end': end,
+            'group_by': group_by,
+            'period': period,
+            'periods': list(REPORT_PERIODS),
+        }
+        return TemplateResponse(request, 'admin/tickets/inventorytransaction/report.html', ctx)
+
+
+def _parse_report_date(value):
+    try:
+        return date.fromisoformat((value or '').strip())
+    except ValueError:
+        return None
+
+
 # ---- Shared helpers ----
 def _csv_http_response(prefix: str) -> HttpResponse:
     """Small helper to return a CSV HttpResponse with a nice filename."""
@@ -352,7 +542,7 @@ class PrinterAdmin(AdminCSSMixin, ImportExportModelAdmin):
         field_name = (request.GET.get("field_name") or request.GET.get("field") or "")
         is_autocomplete = path.endswith("/autocomplete/")
         from_inventory = ("/admin/tickets/inventoryitem/" in referer)
-        if is_autocomplete and (field_name == "compatible_printers" or from_inventory):
+        if is_autocomplete and (field_name in ("compatible_printers", "excluded_printers") or from_inventory):
             return ("make", "model")
         return base
 
@@ -533,10 +723,32 @@ class PrinterAdmin(AdminCSSMixin, ImportExportModelAdmin):
 
 
 # ---------- RequestTicket Admin + Export + Quick Status Actions ----------
+class SupplyLineInline(admin.TabularInline):
+    model = SupplyLine
+    extra = 0
+    fields = ('position', 'item', 'description', 'quantity', 'reserved_quantity')
+    readonly_fields = ('reserved_quantity',)
+    autocomplete_fields = ('item',)
+
+    # Lines of fulfilled or closed tickets are settled history.
+    def _editable(self, obj):
+        return obj is None or obj.status in RequestTicket.PENDING_STATUSES
+
+    def has_add_permission(self, request, obj=None):
+        return self._editable(obj) and super().has_add_permission(request, obj)
+
+    def has_change_permission(self, request, obj=None):
+        return self._editable(obj) and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return self._editable(obj) and super().has_delete_permission(request, obj)
+
+
 @admin.register(RequestTicket)
 class RequestTicketAdmin(AdminCSSMixin, admin.ModelAdmin):
-    list_display = ("printer", "type", "status", "applies_to_group", "created_at")
-    list_filter = ("type", "status", "created_at", "applies_to_group", "group", "printer__building", "printer__make")
+    form = RequestTicketAdminForm
+    list_display = ("printer", "type", "status", "source", "applies_to_group", "created_at")
+    list_filter = ("type", "status", "source", "created_at", "applies_to_group", "group", "printer__building", "printer__make")
     search_fields = (
         "printer__campus_label",
         "printer__asset_tag",
@@ -553,19 +765,94 @@ class RequestTicketAdmin(AdminCSSMixin, admin.ModelAdmin):
     date_hierarchy = "created_at"
     list_per_page = 50
     list_select_related = ("printer", "group")
-    actions = ["mark_in_progress", "mark_fulfilled", "mark_closed", "export_tickets_csv"]
+    inlines = [SupplyLineInline]
+    actions = ["mark_in_progress", "mark_fulfilled", "mark_closed", "print_pick_list", "export_tickets_csv"]
+    change_list_template = "admin/tickets/requestticket/change_list.html"
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom = [
+            path("pick_list/", self.admin_site.admin_view(self.pick_list_view), name="tickets_requestticket_pick_list"),
+        ]
+        return custom + urls
+
+    @admin.action(description="Print pick list for selected tickets")
+    def print_pick_list(self, request, queryset):
+        ids = ",".join(str(pk) for pk in queryset.values_list("pk", flat=True))
+        return HttpResponseRedirect(f"{reverse('admin:tickets_requestticket_pick_list')}?ids={ids}")
+
+    def pick_list_view(self, request):
+        if not self.has_view_permission(request):
+            raise Http404
+        raw = (request.GET.get("ids") or "").strip()
+        ticket_ids = [int(x) for x in raw.split(",") if x.strip().isdigit()] if raw else None
+        pick_list = build_pick_list(ticket_ids)
+        ctx = {
+            **self.admin_site.each_context(request),
+            "title": "Pick list",
+            "opts": self.model._meta,
+            "picks": pick_list.picks,
+            "unmatched": pick_list.unmatched,
+            "ticket_ids": pick_list.ticket_ids,
+            "selected": ticket_ids is not None,
+            "total_units": sum(pick.quantity for pick in pick_list.picks),
+            "generated_at": timezone.now(),
+        }
+        return TemplateResponse(request, "admin/tickets/requestticket/pick_list.html", ctx)
 
     @admin.action(description="Mark selected as In Progress")
     def mark_in_progress(self, request, queryset):
-        queryset.update(status=RequestTicket.IN_PROGRESS)
+        self._set_status(request, queryset, RequestTicket.IN_PROGRESS)
+
+    def _set_status(self, request, queryset, status):
+        # Settle stock reservations only for tickets that actually change status.
+        with transaction.atomic():
+            rows = list(queryset.exclude(status=status).values_list("pk", "status", "printer_id"))
+            ids = [pk for pk, current, _ in rows if can_change_status(current, status)]
+            RequestTicket.objects.filter(pk__in=ids).update(status=status)
+            settle_for_status(ids, status, user=request.user)
+            # update() sends no post_save, so open issue counts are refreshed here.
+            printer_ids = {printer_id for pk, _, printer_id in rows if pk in ids}
+            transaction.on_commit(lambda: refresh_fleet_health_for_printers(printer_ids))
+        skipped = len(rows) - len(ids)
+        if skipped:
+            self.message_user(
+                request,
+                f"Skipped {skipped} fulfilled ticket(s): their stock was already taken out.",
+                level=messages.WARNING,
+            )
+
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not SupplyLine:
+            return super().save_formset(request, form, formset, change)
+        # Keep reservations in step with edited lines: deleted lines are
+        # released by the pre_delete signal, lines whose item or quantity
+        # changed give their reservation back and reserve again below.
+        instances = formset.save(commit=False)
+        for line in formset.deleted_objects:
+            line.delete()
+        edited = [line for line, fields in formset.changed_objects if {"item", "quantity"} & set(fields)]
+        release_lines([line.pk for line in edited])
+        for line in edited:
+            line.reserved_quantity = 0
+        for line in instances:
+            line.save()
+        formset.save_m2m()
+        if form.instance.status in RequestTicket.PENDING_STATUSES:
+            reserve_supply_lines([line for line in instances if not line.reserved_quantity])
 
     @admin.action(description="Mark selected as Fulfilled")
     def mark_fulfilled(self, request, queryset):
-        queryset.update(status=RequestTicket.FULFILLED)
+        self._set_status(request, queryset, RequestTicket.FULFILLED)
 
     @admin.action(description="Mark selected as Closed")
     def mark_closed(self, request, queryset):
-        queryset.update(status=RequestTicket.CLOSED)
+        self._set_status(request, queryset, RequestTicket.CLOSED)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and "status" in form.changed_data:
+            settle_for_status([obj.pk], obj.status, user=request.user)
 
     @admin.action(description="Export selected tickets to CSV")
     def export_tickets_csv(self, request, queryset):
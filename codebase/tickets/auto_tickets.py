@@ -0,0 +1,301 @@
+"""Rule engine that turns SNMP readings into RequestTickets.
+
+Rules run once per poll batch (see ``printer_status.after_poll_batch``) and
+work on the whole batch with a fixed number of queries.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .fleet_health import refresh_fleet_health_for_printers
+from .models import Printer, PrinterCondition, PrinterStatus, RequestTicket, SupplyReading
+from .outbox import queue_ticket_email
+from .supplies import LOW_SUPPLY_PERCENT, compatible_items_by_printer, match_stock_items
+
+AUTO_SUPPLY_TICKETS = bool(getattr(settings, 'AUTO_SUPPLY_TICKETS', False))
+# 'printer' opens one ticket per printer; 'group' one per PrinterGroup
+# (printers without a group always fall back to per-printer tickets).
+AUTO_SUPPLY_TICKET_SCOPE = getattr(settings, 'AUTO_SUPPLY_TICKET_SCOPE', 'printer')
+
+AUTO_REQUESTER_NAME = 'Automatic supply monitor'
+
+AUTO_ISSUE_TICKETS = bool(getattr(settings, 'AUTO_ISSUE_TICKETS', False))
+# A condition must be seen on this many consecutive polls before a ticket opens.
+AUTO_ISSUE_TICKET_POLLS = max(1, int(getattr(settings, 'AUTO_ISSUE_TICKET_POLLS', 3)))
+
+AUTO_ISSUE_REQUESTER_NAME = 'Automatic device monitor'
+
+# hrPrinterDetectedErrorState codes (snmp_client.ERROR_FLAG_MAP) that warrant a ticket
+CRITICAL_ERROR_CODES = {'jammed', 'doorOpen', 'offline', 'serviceRequested'}
+# prtAlertSeverityLevel critical(4)
+CRITICAL_ALERT_SEVERITY = 4
+# Condition code for a printer that stopped answering SNMP
+UNREACHABLE = 'unreachable'
+
+
+def _supply_scope_key(reading: SupplyReading) -> tuple[str, int]:
+    printer = reading.printer
+    if AUTO_SUPPLY_TICKET_SCOPE == 'group' and printer.group_id:
+        return ('group', printer.group_id)
+    return ('printer', printer.id)
+
+
+def _supply_ticket_details(readings: list[SupplyReading], items_by_printer: dict) -> str:
+    lines = [f"Automatic request: supplies at or below {LOW_SUPPLY_PERCENT}%."]
+    for reading in readings:
+        pct = f"{reading.percent}%" if reading.percent is not None else 'unknown'
+        lines.append(f"- {reading.printer.campus_label}: {reading.description} ({pct})")
+        for item in match_stock_items(reading, items_by_printer.get(reading.printer_id, [])):
+            label = item.name + (f" [{item.model_number}]" if item.model_number else '')
+            shelf = f", shelf {item.shelf_code}" if item.shelf_code else ''
+            lines.append(f"    Stock: {label} ({item.quantity_on_hand} on hand{shelf})")
+    return "\n".join(lines)
+
+
+def evaluate_supply_rules(printer_ids: Iterable[int]) -> list[RequestTicket]:
+    """Open SUPPLY tickets for printers whose supplies crossed the low threshold.
+
+    A ticket is opened at most once per low episode (``SupplyReading.low_since``)
+    and never while an automatic supply ticket for the same scope is pending.
+    """
+    if not AUTO_SUPPLY_TICKETS:
+        return []
+    printer_ids = list(printer_ids)
+    if not printer_ids:
+        return []
+
+    low_readings = list(
+        SupplyReading.objects.filter(printer_id__in=printer_ids, low_since__isnull=False)
+        .select_related('printer', 'printer__group')
+        .order_by('printer__campus_label', 'description')
+    )
+    if not low_readings:
+        return []
+
+    by_scope: dict[tuple[str, int], list[SupplyReading]] = {}
+    for reading in low_readings:
+        by_scope.setdefault(_supply_scope_key(reading), []).append(reading)
+
+    scope_printer_ids = [key[1] for key in by_scope if key[0] == 'printer']
+    scope_group_ids = [key[1] for key in by_scope if key[0] == 'group']
+    earliest = min(reading.low_since for reading in low_readings)
+
+    with transaction.atomic():
+        existing = RequestTicket.objects.filter(
+            type=RequestTicket.SUPPLY,
+            source=RequestTicket.AUTO_SUPPLY,
+        ).filter(
+            Q(applies_to_group=False, printer_id__in=scope_printer_ids)
+            | Q(applies_to_group=True, group_id__in=scope_group_ids)
+        ).filter(
+            Q(status__in=RequestTicket.PENDING_STATUSES) | Q(created_at__gte=earliest)
+        ).values_list('applies_to_group', 'printer_id', 'group_id', 'status', 'created_at')
+
+        blocked: dict[tuple[str, int], list[tuple[str, object]]] = {}
+        for applies_to_group, printer_id, group_id, status, created_at in existing:
+            key = ('group', group_id) if applies_to_group else ('printer', printer_id)
+            blocked.setdefault(key, []).append((status, created_at))
+
+        to_open: list[tuple[tuple[str, int], list[SupplyReading]]] = []
+        for key, readings in by_scope.items():
+            episode_start = min(reading.low_since for reading in readings)
+            if any(
+                status in RequestTicket.PENDING_STATUSES or created_at >= episode_start
+                for status, created_at in blocked.get(key, [])
+            ):
+                continue
+            to_open.append((key, readings))
+        if not to_open:
+            return []
+
+        items_by_printer = compatible_items_by_printer({r.printer_id for _, rs in to_open for r in rs})
+        tickets = []
+        for (scope, _), readings in to_open:
+            printer = readings[0].printer
+            tickets.append(RequestTicket(
+                printer=printer,
+                group=printer.group if scope == 'group' else None,
+                applies_to_group=scope == 'group',
+                type=RequestTicket.SUPPLY,
+                source=RequestTicket.AUTO_SUPPLY,
+                requester_name=AUTO_REQUESTER_NAME,
+                details=_supply_ticket_details(readings, items_by_printer),
+            ))
+        created = RequestTicket.objects.bulk_create(tickets)
+        # Same notification as a supply order placed from the portal.
+        for ticket in created:
+            queue_ticket_email(ticket, ticket.printer, 'Group order' if ticket.applies_to_group else 'Single printer')
+        return created
+
+
+def _critical_conditions(status: PrinterStatus) -> dict[str, str]:
+    """Return ``{code: label}`` for the critical conditions in a status."""
+    conditions: dict[str, str] = {}
+    if not status.snmp_ok:
+        # attention=False means SNMP is not configured for this printer, which
+        # says nothing about the device itself.
+        if status.attention:
+            conditions[UNREACHABLE] = 'Printer not responding to SNMP'
+        return conditions
+    for flag in status.error_flags or []:
+        code = flag.get('code') if isinstance(flag, dict) else None
+        if code in CRITICAL_ERROR_CODES:
+            conditions[code] = flag.get('label') or code
+    for alert in status.alerts or []:
+        if not isinstance(alert, dict) or (alert.get('severity_code') or 0) < CRITICAL_ALERT_SEVERITY:
+            continue
+        description = (alert.get('description') or '').strip()
+        if description:
+            conditions[f"alert:{description}"[:100]] = f"Critical alert: {description}"[:255]
+    return conditions
+
+
+def evaluate_alert_rules(statuses: Iterable[PrinterStatus]) -> dict:
+    """Track critical conditions across polls and open/close ISSUE tickets.
+
+    - A condition seen on ``AUTO_ISSUE_TICKET_POLLS`` consecutive polls is
+      attached to the printer's pending automatic ISSUE ticket, or a new one
+      is opened.
+    - Conditions that are still active on an open ticket are not re-reported.
+    - When every condition linked to a pending automatic ticket has cleared,
+      the ticket is closed. A failed poll clears nothing but ``unreachable``
+      itself; device conditions seen before it are kept.
+    """
+    if not AUTO_ISSUE_TICKETS:
+        return {}
+    status_list = [s for s in statuses if s is not None and s.printer_id]
+    if not status_list:
+        return {}
+
+    now = timezone.now()
+    printer_ids = [s.printer_id for s in status_list]
+    active = {s.printer_id: _critical_conditions(s) for s in status_list}
+
+    with transaction.atomic():
+        existing = {
+            (c.printer_id, c.code): c
+            for c in PrinterCondition.objects.select_for_update().filter(printer_id__in=printer_ids)
+        }
+
+        # A failed poll says nothing about jams, doors or alerts: keep those
+        # conditions (and their tickets) as they were until a poll succeeds.
+        unreachable = {s.printer_id for s in status_list if not s.snmp_ok}
+        cleared = [
+            c for key, c in existing.items()
+            if key[1] not in active.get(key[0], {}) and not (key[0] in unreachable and key[1] != UNREACHABLE)
+        ]
+        to_create: list[PrinterCondition] = []
+        to_update: list[PrinterCondition] = []
+        for printer_id, conditions in active.items():
+            for code, label in conditions.items():
+                condition = existing.get((printer_id, code))
+                if condition is None:
+                    to_create.append(PrinterCondition(
+                        printer_id=printer_id,
+                        code=code,
+                        label=label,
+                        consecutive_polls=1,
+                        first_seen_at=now,
+                        last_seen_at=now,
+                    ))
+                else:
+                    condition.consecutive_polls += 1
+                    condition.last_seen_at = now
+                    condition.label = label
+                    to_update.append(condition)
+        created = PrinterCondition.objects.bulk_create(to_create)
+
+        # Conditions that just became ticket-worthy, grouped per printer
+        due: dict[int, list[PrinterCondition]] = {}
+        for condition in list(to_update) + list(created):
+            if condition.ticket_id is None and condition.consecutive_polls >= AUTO_ISSUE_TICKET_POLLS:
+                due.setdefault(condition.printer_id, []).append(condition)
+
+        open_tickets = {
+            t.printer_id: t
+            for t in RequestTicket.objects.filter(
+                type=RequestTicket.ISSUE,
+                source=RequestTicket.AUTO_ALERT,
+                status__in=RequestTicket.PENDING_STATUSES,
+                printer_id__in=set(printer_ids),
+            ).order_by('created_at')
+        }
+
+        group_ids = dict(
+            Printer.objects.filter(pk__in=[pid for pid in due if pid not in open_tickets]).values_list('pk', 'group_id')
+        )
+        new_tickets: list[RequestTicket] = []
+        touched_tickets: dict[int, RequestTicket] = {}
+        for printer_id, conditions in due.items():
+            lines = [f"- {c.label} (since {timezone.localtime(c.first_seen_at):%b %d %I:%M %p})" for c in conditions]
+            ticket = open_tickets.get(printer_id)
+            if ticket is None:
+                ticket = RequestTicket(
+                    printer_id=printer_id,
+                    group_id=group_ids.get(printer_id),
+                    applies_to_group=False,
+                    type=RequestTicket.ISSUE,
+                    source=RequestTicket.AUTO_ALERT,
+                    requester_name=AUTO_ISSUE_REQUESTER_NAME,
+                    details="\n".join(["Automatic report: critical device condition detected."] + lines),
+                )
+                new_tickets.append(ticket)
+            else:
+                ticket.details = "\n".join([ticket.details or ''] + lines).strip()
+                touched_tickets[ticket.pk] = ticket
+            for condition in conditions:
+                condition.ticket = ticket
+        RequestTicket.objects.bulk_create(new_tickets)
+        if new_tickets:
+            printers = Printer.objects.in_bulk([t.printer_id for t in new_tickets])
+            for ticket in new_tickets:
+                queue_ticket_email(ticket, printers[ticket.printer_id], 'Single printer')
+        for tickets_conditions in due.values():
+            for condition in tickets_conditions:
+                condition.ticket_id = condition.ticket.pk
+        if touched_tickets:
+            for ticket in touched_tickets.values():
+                ticket.updated_at = now
+            RequestTicket.objects.bulk_update(list(touched_tickets.values()), ['details', 'updated_at'])
+
+        PrinterCondition.objects.bulk_update(
+            list(to_update) + [c for c in created if c.ticket_id],
+            ['consecutive_polls', 'last_seen_at', 'label', 'ticket'],
+        )
+
+        # Auto-close tickets whose conditions have all cleared
+        cleared_ticket_ids = {c.ticket_id for c in cleared if c.ticket_id}
+        if cleared:
+            PrinterCondition.objects.filter(pk__in=[c.pk for c in cleared]).delete()
+        closed = 0
+        closable: list[RequestTicket] = []
+        if cleared_ticket_ids:
+            still_active = set(
+                PrinterCondition.objects.filter(ticket_id__in=cleared_ticket_ids).values_list('ticket_id', flat=True)
+            )
+            closable = list(
+                RequestTicket.objects.filter(
+                    pk__in=cleared_ticket_ids - still_active,
+                    source=RequestTicket.AUTO_ALERT,
+                    status__in=RequestTicket.PENDING_STATUSES,
+                )
+            )
+            stamp = f"Auto-closed: condition cleared at {timezone.localtime(now):%b %d %I:%M %p}."
+            for ticket in closable:
+                ticket.status = RequestTicket.CLOSED
+                ticket.details = "\n".join([ticket.details or '', stamp]).strip()
+                ticket.updated_at = now
+            RequestTicket.objects.bulk_update(closable, ['status', 'details', 'updated_at'])
+            closed = len(closable)
+
+        # Bulk writes send no post_save; open issue counts change with them.
+        changed_printers = {t.printer_id for t in new_tickets + closable}
+        if changed_printers:
+            transaction.on_commit(lambda: refresh_fleet_health_for_printers(changed_printers))
+
+    return {'opened': len(new_tickets), 'updated': len(touched_tickets), 'closed': closed}
@@ -0,0 +1,158 @@
+"""Printer availability tracking and reporting.
+
+Every poll maps the status to one of the PrinterStateInterval states; a row
+is only written when the state changes. Reports clip the intervals that
+overlap a window and sum their durations in the database.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import DateTimeField, DurationField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from .auto_tickets import CRITICAL_ERROR_CODES
+from .models import Printer, PrinterStateInterval, PrinterStatus
+
+# hrDeviceStatus down(5) -> snmp_client.DEVICE_STATUS_MAP code 6 ("Down")
+DEVICE_STATUS_DOWN = 6
+
+STATES = [state for state, _ in PrinterStateInterval.STATE_CHOICES]
+# States in which the printer can still print
+AVAILABLE_STATES = (PrinterStateInterval.UP, PrinterStateInterval.ATTENTION)
+
+
+def classify_state(status: PrinterStatus) -> str | None:
+    """Availability state for a status, or None when SNMP is not configured."""
+    if not status.snmp_ok:
+        return PrinterStateInterval.UNREACHABLE if status.attention else None
+    codes = {flag.get('code') for flag in status.error_flags or [] if isinstance(flag, dict)}
+    if status.device_status_code == DEVICE_STATUS_DOWN or codes & CRITICAL_ERROR_CODES:
+        return PrinterStateInterval.DOWN
+    if status.attention:
+        return PrinterStateInterval.ATTENTION
+    return PrinterStateInterval.UP
+
+
+def record_state_transitions(statuses: Iterable[PrinterStatus]) -> None:
+    """Post-poll hook: close and open intervals for printers whose state changed."""
+    status_list = [s for s in statuses if s is not None and s.printer_id]
+    if not status_list:
+        return
+    now = timezone.now()
+
+    with transaction.atomic():
+        open_rows = {
+            row.printer_id: row
+            for row in PrinterStateInterval.objects.select_for_update().filter(
+                printer_id__in=[s.printer_id for s in status_list],
+                ended_at__isnull=True,
+            )
+        }
+        to_close: list[PrinterStateInterval] = []
+        to_open: list[PrinterStateInterval] = []
+        for status in status_list:
+            state = classify_state(status)
+            at = status.fetched_at or now
+            current = open_rows.get(status.printer_id)
+            if current is not None and current.state == state:
+                continue
+            if current is not None:
+                current.ended_at = max(at, current.started_at)
+                to_close.append(current)
+            if state is not None:
+                to_open.append(PrinterStateInterval(printer_id=status.printer_id, state=state, started_at=at))
+        # Close first: only one open interval per printer is allowed.
+        if to_close:
+            PrinterStateInterval.objects.bulk_update(to_close, ['ended_at'])
+        if to_open:
+            PrinterStateInterval.objects.bulk_create(to_open)
+
+
+def _empty_stats(window_seconds: float) -> dict:
+    return {
+        **{state: 0.0 for state in STATES},
+        'observed_seconds': 0.0,
+        'window_seconds': window_seconds,
+    }
+
+
+def _finish(stats: dict) -> dict:
+    observed = stats['observed_seconds']
+    available = sum(stats[state] for state in AVAILABLE_STATES)
+    stats['availability_percent'] = round(100.0 * available / observed, 2) if observed else None
+    stats['uptime_percent'] = round(100.0 * stats[PrinterStateInterval.UP] / observed, 2) if observed else None
+    stats['coverage_percent'] = (
+        round(100.0 * observed / stats['window_seconds'], 2) if stats['window_seconds'] else None
+    )
+    return stats
+
+
+def state_durations(printer_ids: Iterable[int], start: datetime, end: datetime) -> dict[int, dict[str, float]]:
+    """Seconds spent in each state per printer within ``[start, end)``.
+
+    One query; both interval indexes bound the scan to rows overlapping the
+    window, and clipping/summing happens in the database.
+    """
+    end = min(end, timezone.now())
+    if end <= start:
+        return {}
+    start_value = Value(start, output_field=DateTimeField())
+    end_value = Value(end, output_field=DateTimeField())
+    rows = (
+        PrinterStateInterval.objects.filter(printer_id__in=list(printer_ids), started_at__lt=end)
+        .filter(Q(ended_at__isnull=True) | Q(ended_at__gt=start))
+        .annotate(
+            clip_start=Greatest('started_at', start_value),
+            clip_end=Least(Coalesce('ended_at', end_value), end_value),
+        )
+        .values('printer_id', 'state')
+        .annotate(
+            duration=Sum(ExpressionWrapper(F('clip_end') - F('clip_start'), output_field=DurationField()))
+        )
+    )
+    durations: dict[int, dict[str, float]] = {}
+    for row in rows:
+        seconds = row['duration'].total_seconds() if row['duration'] else 0.0
+        durations.setdefault(row['printer_id'], {})[row['state']] = max(0.0, seconds)
+    return durations
+
+
+def availability_report(printers: Iterable[Printer], start: datetime, end: datetime) -> dict:
+    """Per-printer and per-group availability over ``[start, end)``.
+
+    Returns ``{'printers': {printer_id: stats}, 'groups': {group_id: stats}}``
+    where stats hold seconds per state, ``observed_seconds`` (time with a known
+    state), ``availability_percent`` (up or attention over observed time),
+    ``uptime_percent`` and ``coverage_percent`` (observed over the window).
+    """
+    printer_list = list(printers)
+    window_seconds = max(0.0, (min(end, timezone.now()) - start).total_seconds())
+    durations = state_durations((p.id for p in printer_list), start, end)
+
+    by_printer: dict[int, dict] = {}
+    by_group: dict[int, dict] = {}
+    for printer in printer_list:
+        stats = _empty_stats(window_seconds)
+        for state, seconds in durations.get(printer.id, {}).items():
+            stats[state] = seconds
+            stats['observed_seconds'] += seconds
+        by_printer[printer.id] = stats
+        if printer.group_id:
+            group_stats = by_group.setdefault(printer.group_id, _empty_stats(0.0))
+            for key in (*STATES, 'observed_seconds'):
+                group_stats[key] += stats[key]
+            group_stats['window_seconds'] += window_seconds
+
+    return {
+        'printers': {pid: _finish(stats) for pid, stats in by_printer.items()},
+        'groups': {gid: _finish(stats) for gid, stats in by_group.items()},
+    }
+
+
+def default_window(days: int = 30) -> tuple[datetime, datetime]:
+    end = timezone.now()
+    return end - timedelta(days=days), end
@@ -0,0 +1,112 @@
+"""Which InventoryItems fit which printers.
+
+An item fits a printer when one of its ConsumableCompatibility rules matches
+the printer's make and model, or the printer is listed in its
+``compatible_printers``; ``excluded_printers`` removes a printer again. The
+resulting printer id -> item ids map is built with a handful of queries and
+kept in the cache until a rule, an override, a printer or an item's label
+changes (see ``tickets/signals.py``), so order forms read it without joins.
+"""
+from __future__ import annotations
+
+import hashlib
+from fnmatch import fnmatchcase
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ConsumableCompatibility, InventoryItem, Printer
+
+COMPATIBILITY_CACHE_SECONDS = int(getattr(settings, 'COMPATIBILITY_CACHE_SECONDS', 3600))
+
+_VERSION_KEY = 'compat:version'
+
+
+def _version() -> int:
+    return cache.get_or_set(_VERSION_KEY, 1, None)
+
+
+def invalidate_compatibility() -> None:
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.set(_VERSION_KEY, 2, None)
+
+
+def _normalize(value: str | None) -> str:
+    return ' '.join((value or '').split()).lower()
+
+
+def build_compatibility_index() -> dict[int, frozenset[int]]:
+    """Map printer id -> ids of the items that fit it."""
+    rules: dict[str, list[tuple[str, int]]] = {}
+    for item_id, make, pattern in ConsumableCompatibility.objects.values_list('item_id', 'make', 'model_pattern'):
+        rules.setdefault(_normalize(make), []).append((_normalize(pattern), item_id))
+
+    # Rules are matched once per distinct (make, model), not once per printer.
+    by_model: dict[tuple[str, str], set[int]] = {}
+    index: dict[int, set[int]] = {}
+    for printer_id, make, model in Printer.objects.values_list('pk', 'make', 'model'):
+        key = (_normalize(make), _normalize(model))
+        if key not in by_model:
+            by_model[key] = {
+                item_id for pattern, item_id in rules.get(key[0], []) if fnmatchcase(key[1], pattern)
+            }
+        if by_model[key]:
+            index[printer_id] = set(by_model[key])
+
+    through = InventoryItem.compatible_printers.through
+    for printer_id, item_id in through.objects.values_list('printer_id', 'inventoryitem_id'):
+        index.setdefault(printer_id, set()).add(item_id)
+    excluded = InventoryItem.excluded_printers.through
+    for printer_id, item_id in excluded.objects.values_list('printer_id', 'inventoryitem_id'):
+        index.get(printer_id, set()).discard(item_id)
+
+    return {printer_id: frozenset(ids) for printer_id, ids in index.items() if ids}
+
+
+def compatibility_index() -> dict[int, frozenset[int]]:
+    if COMPATIBILITY_CACHE_SECONDS <= 0:
+        return build_compatibility_index()
+    key = f"compat:index:{_version()}"
+    index = cache.get(key)
+    if index is None:
+        index = build_compatibility_index()
+        cache.set(key, index, COMPATIBILITY_CACHE_SECONDS)
+    return index
+
+
+def allowed_item_ids(printer_ids: Iterable[int]) -> set[int]:
+    """Ids of the items that fit any of ``printer_ids``."""
+    index = compatibility_index()
+    ids: set[int] = set()
+    for printer_id in printer_ids:
+        ids |= index.get(printer_id, frozenset())
+    return ids
+
+
+def allowed_items(printer_ids: Iterable[int]) -> list[InventoryItem]:
+    """Items that fit any of ``printer_ids``, ordered by name.
+
+    Cached per printer set (one printer, or a group's printers) so repeated
+    form loads skip the query. Quantities in the cached rows may be stale;
+    use them for labels and choices only.
+    """
+    printer_ids = sorted(set(printer_ids))
+    if COMPATIBILITY_CACHE_SECONDS <= 0:
+        return _load_items(printer_ids)
+    digest = hashlib.sha1(','.join(map(str, printer_ids)).encode('ascii')).hexdigest()[:16]
+    key = f"compat:items:{_version()}:{digest}"
+    items = cache.get(key)
+    if items is None:
+        items = _load_items(printer_ids)
+        cache.set(key, items, COMPATIBILITY_CACHE_SECONDS)
+    return items
+
+
+def _load_items(printer_ids: list[int]) -> list[InventoryItem]:
+    ids = allowed_item_ids(printer_ids)
+    if not ids:
+        return []
+    return list(InventoryItem.objects.filter(pk__in=ids).order_by('name'))
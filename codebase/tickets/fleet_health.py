@@ -0,0 +1,149 @@
+"""Maintain FleetHealth rows (per-group and fleet-wide printer health counts).
+
+Counts are recomputed only for the groups touched by a poll batch, ticket
+or printer change, with one grouped query per source table. The fleet-wide
+row is the sum of the group rows plus the printers without a group, so it
+never needs fleet-wide COUNTs of its own.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import FleetHealth, Printer, PrinterGroup, PrinterStatus, RequestTicket, SupplyReading
+from .supplies import LOW_SUPPLY_PERCENT
+
+_COUNT_FIELDS = (
+    'printer_count',
+    'attention_count',
+    'fault_count',
+    'alert_count',
+    'low_supply_count',
+    'open_issue_count',
+)
+
+
+def _zero() -> dict[str, int]:
+    return dict.fromkeys(_COUNT_FIELDS, 0)
+
+
+def _counts(group_ids: set[int | None]) -> dict[int | None, dict[str, int]]:
+    """Counts keyed by group id; ``None`` in ``group_ids`` stands for printers without a group."""
+    ids = [gid for gid in group_ids if gid is not None]
+    printer_filter = Q(group_id__in=ids)
+    related_filter = Q(printer__group_id__in=ids)
+    if None in group_ids:
+        printer_filter |= Q(group_id__isnull=True)
+        related_filter |= Q(printer__group_id__isnull=True)
+    key = 'printer__group_id'
+
+    counts: dict[int | None, dict[str, int]] = {}
+
+    def collect(qs, group_key, **annotations):
+        for row in qs.values(group_key).annotate(**annotations).order_by():
+            target = counts.setdefault(row[group_key], _zero())
+            for name in annotations:
+                target[name] = row[name]
+
+    collect(Printer.objects.filter(printer_filter), 'group_id', printer_count=Count('pk'))
+    collect(
+        PrinterStatus.objects.filter(related_filter),
+        key,
+        attention_count=Count('pk', filter=Q(attention=True)),
+        fault_count=Count('pk', filter=Q(snmp_ok=False)),
+        alert_count=Count('pk', filter=Q(attention=True) | Q(snmp_ok=False)),
+    )
+    collect(
+        SupplyReading.objects.filter(related_filter, percent__isnull=False, percent__lte=LOW_SUPPLY_PERCENT),
+        key,
+        low_supply_count=Count('printer', distinct=True),
+    )
+    collect(
+        RequestTicket.objects.filter(
+            related_filter,
+            type=RequestTicket.ISSUE,
+            status__in=RequestTicket.PENDING_STATUSES,
+        ),
+        key,
+        open_issue_count=Count('pk'),
+    )
+    return counts
+
+
+def _group_totals() -> dict[str, int]:
+    return FleetHealth.objects.filter(group__isnull=False).aggregate(
+        **{name: Coalesce(Sum(name), 0) for name in _COUNT_FIELDS}
+    )
+
+
+def refresh_fleet_health(group_ids: Iterable[int | None] | None = None) -> None:
+    """Recompute health rows for ``group_ids`` (every group when ``None``) and the fleet row.
+
+    ``None`` inside ``group_ids`` stands for printers without a group, which
+    only count towards the fleet-wide row. Groups not listed keep their rows;
+    the fleet row is rebuilt from the group rows.
+    """
+    with transaction.atomic():
+        fleet_row = FleetHealth.objects.select_for_update().filter(group__isnull=True).first()
+        if group_ids is None or fleet_row is None:
+            targets = {*PrinterGroup.objects.values_list('pk', flat=True), None}
+        else:
+            targets = set(group_ids)
+        ids = sorted(gid for gid in targets if gid is not None)
+        counts = _counts(targets) if targets else {}
+
+        if None in targets:
+            ungrouped = counts.get(None, _zero())
+        else:
+            # What the fleet row holds beyond the group rows is the ungrouped part.
+            before = _group_totals()
+            ungrouped = {name: max(0, getattr(fleet_row, name) - before[name]) for name in _COUNT_FIELDS}
+
+        if ids:
+            FleetHealth.objects.bulk_create(
+                [FleetHealth(group_id=gid, **counts.get(gid, _zero())) for gid in ids],
+                update_conflicts=True,
+                unique_fields=['group'],
+                update_fields=[*_COUNT_FIELDS, 'updated_at'],
+            )
+        after = _group_totals()
+        fleet = {name: after[name] + ungrouped[name] for name in _COUNT_FIELDS}
+        if fleet_row is None:
+            FleetHealth.objects.create(group=None, **fleet)
+        else:
+            FleetHealth.objects.filter(pk=fleet_row.pk).update(updated_at=timezone.now(), **fleet)
+
+
+def refresh_fleet_health_for_printers(printer_ids: Iterable[int]) -> None:
+    """Refresh the groups of the given printers (post-poll hook, ticket writes)."""
+    printer_ids = list(printer_ids)
+    if not printer_ids:
+        return
+    group_ids = set(Printer.objects.filter(pk__in=printer_ids).values_list('group_id', flat=True))
+    refresh_fleet_health(group_ids)
+
+
+def fleet_health(group_ids: Iterable[int] | None = None) -> tuple[FleetHealth, dict[int, FleetHealth]]:
+    """Return ``(fleet_row, {group_id: row})``, computing rows that don't exist yet."""
+    group_ids = list(group_ids or [])
+
+    def load():
+        fleet_row = None
+        by_group: dict[int, FleetHealth] = {}
+        for row in FleetHealth.objects.filter(Q(group__isnull=True) | Q(group_id__in=group_ids)):
+            if row.group_id is None:
+                fleet_row = row
+            else:
+                by_group[row.group_id] = row
+        return fleet_row, by_group
+
+    fleet_row, by_group = load()
+    missing = [gid for gid in group_ids if gid not in by_group]
+    if fleet_row is None or missing:
+        refresh_fleet_health(missing)
+        fleet_row, by_group = load()
+    return fleet_row, by_group
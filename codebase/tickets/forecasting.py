@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import SupplyLevelSample, SupplyReading
+
+try:
+    import numpy as np  # type: ignore
+    HAVE_NUMPY = True
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+    HAVE_NUMPY = False
+
+FORECAST_WINDOW_DAYS = int(getattr(settings, 'SUPPLY_FORECAST_WINDOW_DAYS', 30))
+# Minimum samples (after the most recent refill) needed to fit a slope.
+MIN_SAMPLES = 3
+# A rise of more than this many points between samples is treated as a refill.
+REFILL_JUMP_PERCENT = 10
+# Rates slower than this (percent/day) are treated as "not depleting".
+MIN_RATE_PER_DAY = 0.05
+# Forecasts further out than this are not worth surfacing.
+MAX_HORIZON_DAYS = 730
+
+
+class ForecastNotAvailable(RuntimeError):
+    pass
+
+
+def fit_depletion(group: "np.ndarray", t_days: "np.ndarray", percent: "np.ndarray", n_groups: int):
+    """Least-squares slope per group over samples since each group's last refill.
+
+    ``group`` must be sorted (samples of one series are contiguous and in time
+    order). Returns ``(rate_per_day, sample_count)`` arrays of length
+    ``n_groups``; ``rate_per_day`` is NaN where no fit was possible and is
+    positive when the supply is being consumed.
+    """
+    n = group.shape[0]
+    same = group[1:] == group[:-1]
+    # Start each series at its first sample, then move the start past refills.
+    start = np.zeros(n_groups, dtype=np.int64)
+    firsts = np.r_[0, np.nonzero(~same)[0] + 1]
+    start[group[firsts]] = firsts
+    refills = np.nonzero(same & ((percent[1:] - percent[:-1]) > REFILL_JUMP_PERCENT))[0] + 1
+    if refills.size:
+        np.maximum.at(start, group[refills], refills)
+    mask = np.arange(n) >= start[group]
+
+    g, t, y = group[mask], t_days[mask], percent[mask]
+    count = np.bincount(g, minlength=n_groups).astype(float)
+    s_t = np.bincount(g, weights=t, minlength=n_groups)
+    s_y = np.bincount(g, weights=y, minlength=n_groups)
+    s_tt = np.bincount(g, weights=t * t, minlength=n_groups)
+    s_ty = np.bincount(g, weights=t * y, minlength=n_groups)
+    denom = count * s_tt - s_t * s_t
+
+    rate = np.full(n_groups, np.nan)
+    ok = (count >= MIN_SAMPLES) & (denom > 1e-9)
+    rate[ok] = -(count[ok] * s_ty[ok] - s_t[ok] * s_y[ok]) / denom[ok]
+    return rate, count.astype(np.int64)
+
+
+def forecast_supplies(now: datetime | None = None) -> dict:
+    """Fit depletion rates for every printer/supply and store them on SupplyReading.
+
+    All samples in the forecast window are loaded in one query and fitted in a
+    single vectorized pass. Returns a small summary dict.
+    """
+    if not HAVE_NUMPY:
+        raise ForecastNotAvailable("numpy is not installed. Install numpy to enable supply forecasting.")
+
+    now = now or timezone.now()
+    since = now - timedelta(days=FORECAST_WINDOW_DAYS)
+    rows = list(
+        SupplyLevelSample.objects.filter(recorded_at__gte=since)
+        .order_by('printer_id', 'description', 'recorded_at')
+        .values_list('printer_id', 'description', 'percent', 'recorded_at')
+    )
+
+    keys: list[tuple[int, str]] = []
+    group_idx: list[int] = []
+    for printer_id, description, _, _ in rows:
+        key = (printer_id, description)
+        if not keys or keys[-1] != key:
+            keys.append(key)
+        group_idx.append(len(keys) - 1)
+
+    forecasts: dict[tuple[int, str], tuple[float, datetime | None]] = {}
+    if rows:
+        group = np.asarray(group_idx, dtype=np.int64)
+        t_days = np.fromiter(((ts - now).total_seconds() / 86400.0 for _, _, _, ts in rows), dtype=float, count=len(rows))
+        percent = np.fromiter((pct for _, _, pct, _ in rows), dtype=float, count=len(rows))
+        rate, _ = fit_depletion(group, t_days, percent, len(keys))
+
+        last = np.r_[np.nonzero(group[1:] != group[:-1])[0], len(rows) - 1]
+        days_left = np.full(len(keys), np.nan)
+        depleting = np.nan_to_num(rate, nan=0.0) >= MIN_RATE_PER_DAY
+        days_left[depleting] = percent[last][depleting] / rate[depleting]
+        # Days from now until empty, anchored at the latest sample.
+        days_left = days_left + t_days[last]
+
+        for i, key in enumerate(keys):
+            if np.isnan(rate[i]):
+                continue
+            empty_at = None
+            if depleting[i] and days_left[i] <= MAX_HORIZON_DAYS:
+                empty_at = now + timedelta(days=max(0.0, float(days_left[i])))
+            forecasts[key] = (round(float(rate[i]), 4), empty_at)
+
+    readings = list(SupplyReading.objects.only('id', 'printer_id', 'description', 'depletion_rate_per_day', 'predicted_empty_at'))
+    changed = []
+    for reading in readings:
+        rate_value, empty_at = forecasts.get((reading.printer_id, reading.description), (None, None))
+        if reading.depletion_rate_per_day != rate_value or reading.predicted_empty_at != empty_at:
+            reading.depletion_rate_per_day = rate_value
+            reading.predicted_empty_at = empty_at
+            changed.append(reading)
+    if changed:
+        SupplyReading.objects.bulk_update(changed, ['depletion_rate_per_day', 'predicted_empty_at'], batch_size=500)
+
+    return {
+        'samples': len(rows),
+        'series': len(keys),
+        'forecasts': sum(1 for _, empty_at in forecasts.values() if empty_at),
+        'updated': len(changed),
+    }
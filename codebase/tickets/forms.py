@@ -2,6 +2,7 @@ from django import forms
 from django.forms import formset_factory, BaseFormSet
 
 from .models import RequestTicket, InventoryItem
+from .reservations import can_change_status
 from django.core.validators import RegexValidator
 
 
@@ -89,17 +90,33 @@ SupplyItemFormSet = formset_factory(SupplyItemForm, extra=0, min_num=1, validate
 OTHER_SENTINEL = "__OTHER__"
 
 
+class InventoryItemChoices:
+    """Allowed items for one order form, with the choice list and an id -> item map.
+
+    Built once per request and shared by every form in the formset and by the
+    view that turns the selections into ticket lines.
+    """
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.by_id = {str(item.id): item for item in self.items}
+        self.choices = [("", "---------")] + [
+            (str(item.id), f"{item.name}{f' [{item.model_number}]' if item.model_number else ''}")
+            for item in self.items
+        ]
+        self.choices.append((OTHER_SENTINEL, "Other / Not listed"))
+
+    def get(self, value):
+        return self.by_id.get(str(value))
+
+
 class InventorySupplyItemForm(forms.Form):
-    def __init__(self, *args, allowed_items_qs=None, **kwargs):
+    def __init__(self, *args, item_choices=None, allowed_items_qs=None, **kwargs):
         super().__init__(*args, **kwargs)
-        qs = allowed_items_qs if allowed_items_qs is not None else InventoryItem.objects.none()
-        # Build choices from queryset plus an explicit "Other" option
-        choices = [("", "---------")] + [
-            (str(obj.id), f"{obj.name}{f' [{obj.model_number}]' if obj.model_number else ''}")
-            for obj in qs
-        ]
-        choices.append((OTHER_SENTINEL, "Other / Not listed"))
-        self.fields['supply_item'].choices = choices
+        if item_choices is None:
+            qs = allowed_items_qs if allowed_items_qs is not None else InventoryItem.objects.none()
+            item_choices = InventoryItemChoices(qs)
+        self.fields['supply_item'].choices = item_choices.choices
 
     supply_item = forms.ChoiceField(
         choices=[],
@@ -130,13 +147,17 @@ class InventorySupplyItemForm(forms.Form):
 
 
 class BaseInventorySupplyItemFormSet(BaseFormSet):
-    def __init__(self, *args, allowed_items_qs=None, **kwargs):
-        self.allowed_items_qs = allowed_items_qs if allowed_items_qs is not None else InventoryItem.objects.none()
+    def __init__(self, *args, item_choices=None, allowed_items_qs=None, **kwargs):
+        if item_choices is None:
+            qs = allowed_items_qs if allowed_items_qs is not None else InventoryItem.objects.none()
+            item_choices = InventoryItemChoices(qs)
+        self.item_choices = item_choices
         super().__init__(*args, **kwargs)
 
-    def _construct_form(self, i, **kwargs):
-        kwargs['allowed_items_qs'] = self.allowed_items_qs
-        return super()._construct_form(i, **kwargs)
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        kwargs['item_choices'] = self.item_choices
+        return kwargs
 
 
 InventorySupplyItemFormSet = formset_factory(
@@ -214,3 +235,17 @@ class InventoryItemAdminForm(forms.ModelForm):
             self.fields['shelf_row'].widget.attrs['title'] = 'Single letter A-Z'
         except Exception:
             pass
+
+
+class RequestTicketAdminForm(forms.ModelForm):
+    class Meta:
+        model = RequestTicket
+        fields = '__all__'
+
+    def clean_status(self):
+        status = self.cleaned_data.get('status')
+        if self.instance.pk and not can_change_status(self.instance.status, status):
+            raise forms.ValidationError(
+                "A fulfilled ticket cannot be reopened: its stock was already taken out. Place a new order instead."
+            )
+        return status
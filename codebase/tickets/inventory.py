@@ -0,0 +1,267 @@
+"""Atomic stock adjustments for InventoryItem.
+
+``adjust_quantity`` changes ``quantity_on_hand`` with one conditional
+``UPDATE ... RETURNING`` instead of read-modify-save, so concurrent scanner
+stations never lose each other's updates. Quantities never go below zero:
+a decrement larger than the stock is applied as a compare-and-set to zero.
+No row locks are taken (SQLite has none; PostgreSQL only holds the row for
+the single statement).
+
+``apply_scan_batch`` applies a batch of queued scanner scans in one
+transaction: duplicate idempotency keys are skipped and each item gets one
+aggregated adjustment.
+
+Every change is also written to the InventoryTransaction ledger in the same
+transaction (``record_adjustment`` / ``split_into_transactions``);
+``consumption_report`` aggregates it for the admin.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import InventoryItem, InventoryScanReceipt, InventoryTransaction
+
+SCAN_BATCH_LIMIT = 500
+# Receipts only need to outlive the longest time a scanner stays offline.
+SCAN_RECEIPT_DAYS = 30
+
+# Compare-and-set attempts before giving up on a contended clamp-to-zero
+_CAS_ATTEMPTS = 5
+
+
+def _execute_returning(sql: str, params: list) -> int | None:
+    """Run an UPDATE on one item and return its new quantity (None if no row matched)."""
+    with connection.cursor() as cursor:
+        if connection.features.can_return_columns_from_insert:
+            cursor.execute(f"{sql} RETURNING quantity_on_hand", params)
+            row = cursor.fetchone()
+            return row[0] if row else None
+        # Old SQLite without RETURNING: the write lock taken by the UPDATE is
+        # held until commit, so the follow-up read sees our own value.
+        cursor.execute(sql, params)
+        if cursor.rowcount != 1:
+            return None
+        cursor.execute(f"SELECT quantity_on_hand FROM {_table()} WHERE id = %s", [params[-1]])
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+
+def _table() -> str:
+    return connection.ops.quote_name(InventoryItem._meta.db_table)
+
+
+def adjust_quantity(item_id: int, delta: int) -> tuple[int, int] | None:
+    """Add ``delta`` to an item's stock, clamped at zero.
+
+    Returns ``(before, after)``, or None if the item does not exist. Callers
+    that need several statements to agree should wrap this in ``atomic()``.
+    """
+    table = _table()
+    if delta >= 0:
+        after = _execute_returning(
+            f"UPDATE {table} SET quantity_on_hand = quantity_on_hand + %s WHERE id = %s",
+            [delta, item_id],
+        )
+        return None if after is None else (after - delta, after)
+
+    after = _execute_returning(
+        f"UPDATE {table} SET quantity_on_hand = quantity_on_hand - %s WHERE quantity_on_hand >= %s AND id = %s",
+        [-delta, -delta, item_id],
+    )
+    if after is not None:
+        return after - delta, after
+
+    # Not enough stock for the whole decrement: set it to zero, but only if
+    # the quantity is still the one we read.
+    for _ in range(_CAS_ATTEMPTS):
+        current = InventoryItem.objects.filter(pk=item_id).values_list('quantity_on_hand', flat=True).first()
+        if current is None:
+            return None
+        if current >= -delta:
+            after = _execute_returning(
+                f"UPDATE {table} SET quantity_on_hand = quantity_on_hand - %s WHERE quantity_on_hand >= %s AND id = %s",
+                [-delta, -delta, item_id],
+            )
+            if after is not None:
+                return after - delta, after
+            continue
+        if current == 0:
+            return 0, 0
+        if _execute_returning(
+            f"UPDATE {table} SET quantity_on_hand = 0 WHERE quantity_on_hand = %s AND id = %s",
+            [current, item_id],
+        ) is not None:
+            return current, 0
+    raise RuntimeError(f"Inventory item {item_id} changed too often to adjust")
+
+
+def split_into_transactions(
+    item_id: int,
+    before: int,
+    parts: list[tuple[int, dict]],
+    *,
+    source: str,
+    user=None,
+) -> list[InventoryTransaction]:
+    """Ledger rows for one aggregated adjustment made of several ``(delta, fields)`` parts.
+
+    Additions are listed before removals, so clamping at zero lands on the
+    removals and the last row ends at the same quantity as the single UPDATE.
+    """
+    rows: list[InventoryTransaction] = []
+    running = before
+    for delta, fields in sorted(parts, key=lambda part: part[0] < 0):
+        after = max(0, running + delta)
+        if after != running:
+            rows.append(InventoryTransaction(
+                item_id=item_id,
+                delta=after - running,
+                quantity_before=running,
+                quantity_after=after,
+                user=user if getattr(user, 'is_authenticated', False) else None,
+                source=source,
+                **fields,
+            ))
+        running = after
+    return rows
+
+
+def record_adjustment(item_id: int, delta: int, *, source: str, user=None, **fields) -> tuple[int, int] | None:
+    """``adjust_quantity`` plus its ledger row, in one transaction."""
+    with transaction.atomic():
+        result = adjust_quantity(item_id, delta)
+        if result is not None:
+            InventoryTransaction.objects.bulk_create(
+                split_into_transactions(item_id, result[0], [(delta, fields)], source=source, user=user)
+            )
+    return result
+
+
+def _clean_scan(scan) -> dict | None:
+    if not isinstance(scan, dict):
+        return None
+    key = str(scan.get('key') or '').strip()
+    barcode = str(scan.get('barcode') or '').strip()
+    mode = str(scan.get('mode') or 'out').lower()
+    if not key or len(key) > 64 or not barcode or mode not in ('in', 'out'):
+        return None
+    return {
+        'key': key,
+        'barcode': barcode,
+        'mode': mode,
+        'destination': str(scan.get('destination') or '').strip()[:200] if mode == 'out' else '',
+    }
+
+
+def _apply_batch(scans: list[dict], user) -> tuple[list[dict], dict[int, dict]]:
+    with transaction.atomic():
+        done = set(
+            InventoryScanReceipt.objects.filter(key__in=[s['key'] for s in scans]).values_list('key', flat=True)
+        )
+        items = InventoryItem.objects.in_bulk({s['barcode'] for s in scans}, field_name='barcode')
+
+        results: list[dict] = []
+        receipts: list[InventoryScanReceipt] = []
+        totals: dict[int, int] = {}
+        by_destination: dict[int, dict[str, int]] = {}
+        for scan in scans:
+            item = items.get(scan['barcode'])
+            if scan['key'] in done:
+                results.append({**scan, 'status': 'duplicate', 'item': item})
+                continue
+            done.add(scan['key'])
+            if item is None:
+                results.append({**scan, 'status': 'not-found', 'item': None})
+                continue
+            delta = 1 if scan['mode'] == 'in' else -1
+            receipts.append(InventoryScanReceipt(key=scan['key'], item=item, delta=delta))
+            totals[item.pk] = totals.get(item.pk, 0) + delta
+            per_item = by_destination.setdefault(item.pk, {})
+            per_item[scan['destination']] = per_item.get(scan['destination'], 0) + delta
+            results.append({**scan, 'status': 'applied', 'item': item, 'delta': delta})
+
+        changes: dict[int, dict] = {}
+        ledger: list[InventoryTransaction] = []
+        gone: set[int] = set()
+        for item_id in sorted(totals):  # fixed order keeps concurrent batches from deadlocking
+            result = adjust_quantity(item_id, totals[item_id])
+            if result is None:
+                # Deleted since it was read above.
+                gone.add(item_id)
+                continue
+            before, after = result
+            changes[item_id] = {'before': before, 'after': after, 'requested': totals[item_id], 'applied': after - before}
+            ledger.extend(split_into_transactions(
+                item_id,
+                before,
+                [(delta, {'destination': dest}) for dest, delta in by_destination[item_id].items() if delta],
+                source=InventoryTransaction.BATCH_SCAN,
+                user=user,
+            ))
+        if gone:
+            receipts = [r for r in receipts if r.item_id not in gone]
+            results = [
+                {**r, 'status': 'not-found', 'item': None} if r['status'] == 'applied' and r['item'].pk in gone else r
+                for r in results
+            ]
+        InventoryScanReceipt.objects.bulk_create(receipts)
+        InventoryTransaction.objects.bulk_create(ledger)
+    return results, changes
+
+
+def apply_scan_batch(scans: list, *, user=None) -> tuple[list[dict], dict[int, dict]]:
+    """Apply queued scans ``{'key', 'barcode', 'mode', 'destination'}`` at once.
+
+    Returns ``(results, changes)``: one result per scan with ``status``
+    ``applied``, ``duplicate``, ``not-found`` or ``invalid``, and per item id
+    the ``before``/``after`` quantities plus the ``requested`` and ``applied``
+    deltas (they differ when stock ran out).
+    """
+    cleaned: list[dict] = []
+    invalid: list[dict] = []
+    for scan in scans[:SCAN_BATCH_LIMIT]:
+        clean = _clean_scan(scan)
+        if clean is None:
+            key = str(scan.get('key') or '') if isinstance(scan, dict) else ''
+            invalid.append({'key': key, 'status': 'invalid', 'item': None})
+        else:
+            cleaned.append(clean)
+
+    try:
+        results, changes = _apply_batch(cleaned, user)
+    except IntegrityError:
+        # Another request stored one of these keys first; re-read receipts.
+        results, changes = _apply_batch(cleaned, user)
+
+    InventoryScanReceipt.objects.filter(created_at__lt=timezone.now() - timedelta(days=SCAN_RECEIPT_DAYS)).delete()
+    return results + invalid, changes
+
+
+REPORT_PERIODS = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+REPORT_GROUPS = {'item': 'item__name', 'destination': 'destination'}
+
+
+def consumption_report(start, end, *, group_by: str = 'item', period: str = 'week') -> list[dict]:
+    """Units taken out of stock between ``start`` and ``end`` (datetimes).
+
+    One row ``{'period', 'label', 'quantity'}`` per period and item (or
+    destination), newest period first. Only removals are counted.
+    """
+    trunc = REPORT_PERIODS.get(period, TruncWeek)
+    label = REPORT_GROUPS.get(group_by, 'item__name')
+    rows = (
+        InventoryTransaction.objects.filter(delta__lt=0, created_at__gte=start, created_at__lt=end)
+        .annotate(period=trunc('created_at'))
+        .values('period', label)
+        .annotate(quantity=Sum(-F('delta')))
+        .order_by('-period', '-quantity', label)
+    )
+    return [
+        {'period': row['period'], 'label': row[label] or '(none)', 'quantity': row['quantity']}
+        for row in rows
+    ]
@@ -0,0 +1,123 @@
+"""Bounded background pool for outgoing email.
+
+A fixed number of worker threads take jobs from a bounded queue. Each
+worker keeps one mail connection (``get_connection``) open across jobs and
+closes it after ``MAIL_IDLE_SECONDS`` without work or after an error. Jobs
+are callables ``job(connection) -> (sent, failed)``; when the queue is full,
+new jobs are dropped and counted rather than blocking the request.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from typing import Callable, Iterable
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections
+
+MAIL_WORKERS = max(1, int(getattr(settings, 'MAIL_WORKERS', 2)))
+MAIL_QUEUE_LIMIT = max(1, int(getattr(settings, 'MAIL_QUEUE_LIMIT', 100)))
+# Socket timeout for each SMTP operation, so one stuck message can't hold a worker.
+MAIL_SEND_TIMEOUT = int(getattr(settings, 'MAIL_SEND_TIMEOUT_SECONDS', 20))
+MAIL_IDLE_SECONDS = 30
+
+logger = logging.getLogger(__name__)
+
+MailJob = Callable[[object], tuple[int, int]]
+
+
+class MailWorkerPool:
+    def __init__(self, workers: int, queue_limit: int):
+        self._workers = workers
+        self._queue: queue.Queue[tuple[str | None, MailJob]] = queue.Queue(maxsize=queue_limit)
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        # Keys of jobs waiting in the queue (used to coalesce repeated kicks)
+        self._queued_keys: set[str] = set()
+        self._counters = {'queued': 0, 'sent': 0, 'failed': 0, 'dropped': 0}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, 'backlog': self._queue.qsize()}
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for name, value in deltas.items():
+                self._counters[name] += value
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self._workers):
+                thread = threading.Thread(target=self._run, name=f'mail-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, job: MailJob, *, key: str | None = None) -> bool:
+        """Queue ``job``; returns False if it was dropped (queue full) or coalesced."""
+        self._ensure_started()
+        with self._lock:
+            if key is not None and key in self._queued_keys:
+                return False
+            try:
+                self._queue.put_nowait((key, job))
+            except queue.Full:
+                self._counters['dropped'] += 1
+                logger.warning("Mail queue full (%s jobs); dropping job %s", self._queue.maxsize, key or job)
+                return False
+            if key is not None:
+                self._queued_keys.add(key)
+            self._counters['queued'] += 1
+        return True
+
+    def _run(self) -> None:
+        connection = None
+        while True:
+            try:
+                key, job = self._queue.get(timeout=MAIL_IDLE_SECONDS)
+            except queue.Empty:
+                if connection is not None:
+                    _close_quietly(connection)
+                    connection = None
+                continue
+            with self._lock:
+                self._queued_keys.discard(key)
+            if connection is None:
+                connection = get_connection(fail_silently=False, timeout=MAIL_SEND_TIMEOUT)
+            close_old_connections()
+            try:
+                sent, failed = job(connection)
+                self._count(sent=sent, failed=failed)
+            except Exception:
+                logger.exception("Mail job failed")
+                self._count(failed=1)
+                # Start over with a fresh connection after any error.
+                _close_quietly(connection)
+                connection = None
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+
+def _close_quietly(connection) -> None:
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+mail_pool = MailWorkerPool(MAIL_WORKERS, MAIL_QUEUE_LIMIT)
+
+
+def send_mail_async(subject: str, body: str, recipients: Iterable[str], *, from_email: str | None = None) -> bool:
+    """Send one plain-text email from the worker pool."""
+    recipients = list(recipients)
+
+    def _job(connection) -> tuple[int, int]:
+        message = EmailMessage(subject, body, from_email or settings.DEFAULT_FROM_EMAIL, recipients, connection=connection)
+        return message.send(), 0
+
+    return mail_pool.submit(_job)
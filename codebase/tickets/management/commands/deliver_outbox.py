@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from tickets.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Send due emails from the outbox (ticket notifications), retrying earlier failures."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=20,
+            help='Stop after this many batches (default 20).',
+        )
+
+    def handle(self, *args, **options):
+        totals = drain_outbox(max_batches=max(1, options['max_batches']))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Outbox: {totals['sent']} sent, {totals['retrying']} to retry, {totals['failed']} gave up."
+            )
+        )
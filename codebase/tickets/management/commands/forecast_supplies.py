@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from tickets.forecasting import ForecastNotAvailable, forecast_supplies
+
+
+class Command(BaseCommand):
+    help = "Fit toner/supply depletion rates from recent history and store predicted empty dates."
+
+    def handle(self, *args, **options):
+        try:
+            summary = forecast_supplies()
+        except ForecastNotAvailable as exc:
+            self.stdout.write(self.style.WARNING(str(exc)))
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Fitted {summary['series']} supply series from {summary['samples']} samples; "
+                f"{summary['forecasts']} have a predicted empty date ({summary['updated']} readings updated)."
+            )
+        )
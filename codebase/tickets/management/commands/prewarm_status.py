@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 
 from tickets.models import Printer
-from tickets.printer_status import ensure_latest_status
+from tickets.printer_status import refresh_statuses
 
 
 class Command(BaseCommand):
@@ -17,9 +17,6 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         force = bool(options.get("force"))
         printers = list(Printer.objects.all().order_by("campus_label"))
-        total = 0
-        for p in printers:
-            ensure_latest_status(p, force=force)
-            total += 1
+        total = len(refresh_statuses(printers, force=force))
         self.stdout.write(self.style.SUCCESS(f"Prewarmed {total} printers (force={force})"))
 
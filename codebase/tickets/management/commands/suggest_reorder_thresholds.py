@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from tickets.reorder import ReorderNotAvailable, suggest_reorder_thresholds
+
+
+class Command(BaseCommand):
+    help = "Compute inventory consumption rates from the ledger and store suggested reorder thresholds."
+
+    def handle(self, *args, **options):
+        try:
+            summary = suggest_reorder_thresholds()
+        except ReorderNotAvailable as exc:
+            self.stdout.write(self.style.WARNING(str(exc)))
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Analysed {summary['removals']} stock removals across {summary['items']} items; "
+                f"{summary['suggestions']} have a suggested threshold ({summary['changed']} changed)."
+            )
+        )
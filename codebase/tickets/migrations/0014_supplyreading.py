@@ -0,0 +1,78 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copy of tickets.supplies.classify_supply as of this migration; the
+# first keyword found in the description wins.
+KIND_KEYWORDS = [
+    ('waste', ('waste',)),
+    ('drum', ('drum', 'photoconductor', 'imaging unit')),
+    ('fuser', ('fuser',)),
+    ('maintenance', ('maintenance', 'transfer', 'kit')),
+    ('staple', ('staple',)),
+    ('toner', ('toner', 'cartridge', 'ink')),
+]
+
+
+def classify_supply(description):
+    text = (description or '').lower()
+    for kind, keywords in KIND_KEYWORDS:
+        if any(word in text for word in keywords):
+            return kind
+    return 'other'
+
+
+def backfill_supply_readings(apps, schema_editor):
+    PrinterStatus = apps.get_model('tickets', 'PrinterStatus')
+    SupplyReading = apps.get_model('tickets', 'SupplyReading')
+    rows = []
+    for status in PrinterStatus.objects.exclude(supplies=[]).iterator():
+        seen = set()
+        for supply in status.supplies or []:
+            if not isinstance(supply, dict):
+                continue
+            description = (supply.get('description') or '').strip()[:255]
+            if not description or description in seen:
+                continue
+            seen.add(description)
+            percent = supply.get('percent')
+            rows.append(SupplyReading(
+                printer_id=status.printer_id,
+                description=description,
+                kind=classify_supply(description),
+                percent=max(0, min(100, int(percent))) if isinstance(percent, (int, float)) else None,
+                level=supply.get('level'),
+                max_capacity=supply.get('max_capacity'),
+            ))
+    SupplyReading.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0013_inventoryitem_barcode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplyReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.CharField(max_length=255)),
+                ('kind', models.CharField(choices=[('toner', 'Toner'), ('drum', 'Drum'), ('waste', 'Waste container'), ('fuser', 'Fuser'), ('maintenance', 'Maintenance kit'), ('staple', 'Staples'), ('other', 'Other')], default='other', max_length=20)),
+                ('percent', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('level', models.IntegerField(blank=True, null=True)),
+                ('max_capacity', models.IntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('printer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='supply_readings', to='tickets.printer')),
+            ],
+            options={
+                'verbose_name': 'Supply reading',
+                'verbose_name_plural': 'Supply readings',
+                'ordering': ['printer_id', 'description'],
+                'indexes': [models.Index(fields=['percent'], name='tickets_sup_percent_1226ab_idx'), models.Index(fields=['kind', 'percent'], name='tickets_sup_kind_ff3b68_idx')],
+                'constraints': [models.UniqueConstraint(fields=('printer', 'description'), name='uniq_supply_reading_printer_description')],
+            },
+        ),
+        migrations.RunPython(backfill_supply_readings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0014_supplyreading'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplyreading',
+            name='depletion_rate_per_day',
+            field=models.FloatField(blank=True, help_text='Percent consumed per day.', null=True),
+        ),
+        migrations.AddField(
+            model_name='supplyreading',
+            name='last_sampled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='supplyreading',
+            name='predicted_empty_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='SupplyLevelSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.CharField(max_length=255)),
+                ('percent', models.PositiveSmallIntegerField()),
+                ('recorded_at', models.DateTimeField(db_index=True)),
+                ('printer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='supply_samples', to='tickets.printer')),
+            ],
+            options={
+                'verbose_name': 'Supply level sample',
+                'verbose_name_plural': 'Supply level samples',
+                'indexes': [models.Index(fields=['printer', 'description', 'recorded_at'], name='tickets_sup_printer_1e8b66_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0015_supply_forecasting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestticket',
+            name='source',
+            field=models.CharField(choices=[('MANUAL', 'Submitted by a person'), ('AUTO_SUPPLY', 'Automatic (supply levels)')], db_index=True, default='MANUAL', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='supplyreading',
+            name='low_since',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
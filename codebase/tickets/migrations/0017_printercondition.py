@@ -0,0 +1,35 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0016_auto_supply_tickets'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='requestticket',
+            name='source',
+            field=models.CharField(choices=[('MANUAL', 'Submitted by a person'), ('AUTO_SUPPLY', 'Automatic (supply levels)'), ('AUTO_ALERT', 'Automatic (device alerts)')], db_index=True, default='MANUAL', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='PrinterCondition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=100)),
+                ('label', models.CharField(max_length=255)),
+                ('consecutive_polls', models.PositiveIntegerField(default=1)),
+                ('first_seen_at', models.DateTimeField()),
+                ('last_seen_at', models.DateTimeField()),
+                ('printer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conditions', to='tickets.printer')),
+                ('ticket', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='conditions', to='tickets.requestticket')),
+            ],
+            options={
+                'verbose_name': 'Printer condition',
+                'verbose_name_plural': 'Printer conditions',
+                'constraints': [models.UniqueConstraint(fields=('printer', 'code'), name='uniq_printer_condition_code')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0017_printercondition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FleetHealth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('printer_count', models.PositiveIntegerField(default=0)),
+                ('attention_count', models.PositiveIntegerField(default=0)),
+                ('fault_count', models.PositiveIntegerField(default=0)),
+                ('alert_count', models.PositiveIntegerField(default=0)),
+                ('low_supply_count', models.PositiveIntegerField(default=0)),
+                ('open_issue_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('group', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='health', to='tickets.printergroup')),
+            ],
+            options={
+                'verbose_name': 'Fleet health',
+                'verbose_name_plural': 'Fleet health',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0018_fleethealth'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrinterStateInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.CharField(choices=[('up', 'Up'), ('attention', 'Needs attention'), ('down', 'Down'), ('unreachable', 'Unreachable')], max_length=20)),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('printer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='state_intervals', to='tickets.printer')),
+            ],
+            options={
+                'verbose_name': 'Printer state interval',
+                'verbose_name_plural': 'Printer state intervals',
+                'indexes': [models.Index(fields=['printer', 'started_at'], name='state_interval_start_idx'), models.Index(fields=['printer', 'ended_at'], name='state_interval_end_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('ended_at__isnull', True)), fields=('printer',), name='uniq_open_state_interval')],
+            },
+        ),
+    ]
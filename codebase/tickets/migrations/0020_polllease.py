@@ -0,0 +1,24 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0019_printerstateinterval'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollLease',
+            fields=[
+                ('printer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='poll_lease', serialize=False, to='tickets.printer')),
+                ('owner', models.CharField(blank=True, max_length=100)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Poll lease',
+                'verbose_name_plural': 'Poll leases',
+            },
+        ),
+    ]
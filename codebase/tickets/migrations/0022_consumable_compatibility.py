@@ -0,0 +1,36 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0021_outboxemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='excluded_printers',
+            field=models.ManyToManyField(blank=True, help_text='Printers this item does not fit even though a make/model rule matches.', related_name='excluded_consumables', to='tickets.printer'),
+        ),
+        migrations.AlterField(
+            model_name='inventoryitem',
+            name='compatible_printers',
+            field=models.ManyToManyField(blank=True, help_text='Individual printers this item fits in addition to the make/model rules.', to='tickets.printer'),
+        ),
+        migrations.CreateModel(
+            name='ConsumableCompatibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('make', models.CharField(help_text="Printer make, e.g. 'Toshiba'.", max_length=100)),
+                ('model_pattern', models.CharField(help_text="Printer model, or a pattern such as 'e-STUDIO 4*' ('*' matches anything).", max_length=100)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compatibility_rules', to='tickets.inventoryitem')),
+            ],
+            options={
+                'verbose_name': 'Compatibility rule',
+                'verbose_name_plural': 'Compatibility rules',
+                'constraints': [models.UniqueConstraint(fields=('item', 'make', 'model_pattern'), name='uniq_item_make_model_pattern')],
+            },
+        ),
+    ]
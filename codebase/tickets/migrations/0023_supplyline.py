@@ -0,0 +1,29 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0022_consumable_compatibility'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplyLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.CharField(max_length=255)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('position', models.PositiveSmallIntegerField(default=1)),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='supply_lines', to='tickets.inventoryitem')),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='supply_lines', to='tickets.requestticket')),
+            ],
+            options={
+                'verbose_name': 'Supply line',
+                'verbose_name_plural': 'Supply lines',
+                'ordering': ['ticket', 'position'],
+                'indexes': [models.Index(fields=['item', 'ticket'], name='supplyline_item_ticket_idx')],
+            },
+        ),
+    ]
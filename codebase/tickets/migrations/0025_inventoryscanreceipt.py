@@ -0,0 +1,27 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0024_inventory_reservations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryScanReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('delta', models.SmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scan_receipts', to='tickets.inventoryitem')),
+            ],
+            options={
+                'verbose_name': 'Inventory scan receipt',
+                'verbose_name_plural': 'Inventory scan receipts',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0025_inventoryscanreceipt'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('quantity_before', models.PositiveIntegerField()),
+                ('quantity_after', models.PositiveIntegerField()),
+                ('destination', models.CharField(blank=True, max_length=200)),
+                ('source', models.CharField(choices=[('scan', 'Scanner'), ('batch_scan', 'Scanner (offline batch)'), ('fulfilment', 'Ticket fulfilled')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('item', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='tickets.inventoryitem')),
+                ('ticket', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_transactions', to='tickets.requestticket')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Inventory transaction',
+                'verbose_name_plural': 'Inventory transactions',
+                'indexes': [models.Index(fields=['item', 'created_at'], name='invtxn_item_time_idx'), models.Index(fields=['created_at'], name='invtxn_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0026_inventorytransaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='consumption_rate_per_day',
+            field=models.FloatField(blank=True, help_text='Average units used per day.', null=True),
+        ),
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='consumption_stddev_per_day',
+            field=models.FloatField(blank=True, help_text='Day-to-day variation in units used.', null=True),
+        ),
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='reorder_suggested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='suggested_reorder_threshold',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0027_inventoryitem_reorder_suggestions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(django.db.models.functions.text.Length(django.db.models.functions.comparison.Coalesce(django.db.models.functions.text.Upper('shelf_row'), django.db.models.expressions.RawSQL("''", (), output_field=models.CharField()))), django.db.models.functions.comparison.Coalesce(django.db.models.functions.text.Upper('shelf_row'), django.db.models.expressions.RawSQL("''", (), output_field=models.CharField())), django.db.models.functions.comparison.Coalesce('shelf_column', django.db.models.expressions.RawSQL('0', (), output_field=models.IntegerField())), models.F('name'), name='inventory_shelf_order_idx'),
+        ),
+    ]
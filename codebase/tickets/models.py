@@ -1,6 +1,9 @@
 from django.db import models
 from django.conf import settings
 from django.core.validators import RegexValidator
+from django.utils import timezone
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Length, Upper
 from django.utils.crypto import get_random_string
 
 
@@ -14,6 +17,27 @@ class PrinterComment(models.Model):
         return f"Comment by {self.user} on {self.printer} at {self.created_at:%Y-%m-%d %H:%M}"
 
 
+# Shelf order in SQL: row letters by ordinal (A..Z, then AA..; shorter rows
+# first, like spreadsheet columns), then column, then name. Unset rows and
+# columns sort first, as 0. The same expressions back InventoryItem's
+# inventory_shelf_order_idx, so ordering by them can use the index. The
+# defaults are SQL literals, not Value() parameters: SQLite only matches an
+# expression index when the ORDER BY has the exact same constants.
+_SHELF_ROW = Coalesce(Upper('shelf_row'), RawSQL("''", (), output_field=models.CharField()))
+SHELF_ORDER = (
+    Length(_SHELF_ROW),
+    _SHELF_ROW,
+    Coalesce('shelf_column', RawSQL('0', (), output_field=models.IntegerField())),
+    models.F('name'),
+)
+
+
+class InventoryItemQuerySet(models.QuerySet):
+    def in_shelf_order(self):
+        """Order by shelf position in the database (see ``SHELF_ORDER``)."""
+        return self.order_by(*SHELF_ORDER)
+
+
 class InventoryItem(models.Model):
     name = models.CharField(max_length=100, help_text="User-friendly name, e.g., 'Toshiba color black toner'")
     model_number = models.CharField(max_length=100, blank=True, help_text="Exact model/part number, e.g., 'T-FC415K'")
@@ -27,8 +51,26 @@ class InventoryItem(models.Model):
         ]
     )
     quantity_on_hand = models.PositiveIntegerField(default=0)
+    # Units promised to pending SUPPLY tickets (see tickets.reservations)
+    quantity_reserved = models.PositiveIntegerField(default=0)
     reorder_threshold = models.PositiveIntegerField(default=1)
-    compatible_printers = models.ManyToManyField('Printer', blank=True)
+    # Filled in by tickets.reorder.suggest_reorder_thresholds()
+    consumption_rate_per_day = models.FloatField(null=True, blank=True, help_text="Average units used per day.")
+    consumption_stddev_per_day = models.FloatField(null=True, blank=True, help_text="Day-to-day variation in units used.")
+    suggested_reorder_threshold = models.PositiveIntegerField(null=True, blank=True)
+    reorder_suggested_at = models.DateTimeField(null=True, blank=True)
+    # Per-printer overrides on top of the make/model rules (ConsumableCompatibility)
+    compatible_printers = models.ManyToManyField(
+        'Printer',
+        blank=True,
+        help_text="Individual printers this item fits in addition to the make/model rules.",
+    )
+    excluded_printers = models.ManyToManyField(
+        'Printer',
+        blank=True,
+        related_name='excluded_consumables',
+        help_text="Printers this item does not fit even though a make/model rule matches.",
+    )
     # Optional barcode/UPC/EAN text for scanning workflows
     barcode = models.CharField(
         max_length=64,
@@ -55,8 +97,19 @@ class InventoryItem(models.Model):
         help_text="Shelf column number (e.g., 1, 2, 10)."
     )
 
+    objects = InventoryItemQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(*SHELF_ORDER, name='inventory_shelf_order_idx'),
+        ]
+
+    @property
+    def quantity_available(self) -> int:
+        return max(0, self.quantity_on_hand - self.quantity_reserved)
+
     def needs_reorder(self):
-        return self.quantity_on_hand <= self.reorder_threshold
+        return self.quantity_available <= self.reorder_threshold
 
     def __str__(self):
         return f"{self.name} ({self.category}) [{self.model_number}]"
@@ -69,33 +122,6 @@ class InventoryItem(models.Model):
             return ""
         return f"{self.shelf_row}-{self.shelf_column}"
 
-    def _row_number(self) -> int:
-        """Convert row letters (A, B, ..., Z, AA, AB, ...) to a 1-based number.
-
-        This matches spreadsheet-style base-26 encoding: A=1, Z=26, AA=27, AB=28, etc.
-        Returns 0 if row is not set.
-        """
-        if not self.shelf_row:
-            return 0
-        total = 0
-        for ch in self.shelf_row.strip().upper():
-            if 'A' <= ch <= 'Z':
-                total = total * 26 + (ord(ch) - ord('A') + 1)
-            else:
-                # Non-letter encountered; stop processing
-                break
-        return total
-
-    @property
-    def shelf_sort_key(self) -> tuple[int, int, str]:
-        """Key for Python-level sorting: by row (letters), then column (number), then name.
-
-        Useful for in-memory sorts where DB ordering is not enough.
-        """
-        row_num = self._row_number()
-        col_num = self.shelf_column or 0
-        return (row_num, col_num, (self.name or ""))
-
     def clean(self):
         # Normalize shelf_row to uppercase letters (if provided)
         super().clean()
@@ -271,12 +297,23 @@ class RequestTicket(models.Model):
         (FULFILLED, 'Fulfilled'),
         (CLOSED, 'Closed'),
     ]
+    PENDING_STATUSES = (NEW, IN_PROGRESS)
+
+    MANUAL = 'MANUAL'
+    AUTO_SUPPLY = 'AUTO_SUPPLY'
+    AUTO_ALERT = 'AUTO_ALERT'
+    SOURCE_CHOICES = [
+        (MANUAL, 'Submitted by a person'),
+        (AUTO_SUPPLY, 'Automatic (supply levels)'),
+        (AUTO_ALERT, 'Automatic (device alerts)'),
+    ]
 
     printer = models.ForeignKey(Printer, on_delete=models.CASCADE)
     group = models.ForeignKey(PrinterGroup, on_delete=models.SET_NULL, null=True, blank=True, related_name='tickets')
     applies_to_group = models.BooleanField(default=False)
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=NEW)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default=MANUAL, db_index=True)
 
     requester_name = models.CharField(max_length=120, blank=True)
     requester_email = models.EmailField(blank=True)
@@ -363,6 +400,405 @@ class PrinterStatus(models.Model):
         if self.attention:
             return 'warning'
         return 'normal'
-
-
-
+
+
+class SupplyReading(models.Model):
+    """Normalized copy of the latest supply levels in ``PrinterStatus.supplies``.
+
+    One row per printer/supply description, rewritten on every poll so
+    fleet-wide questions ("which printers have toner under 10%?") are a single
+    indexed query instead of a JSON scan in Python.
+    """
+
+    TONER = 'toner'
+    DRUM = 'drum'
+    WASTE = 'waste'
+    FUSER = 'fuser'
+    MAINTENANCE = 'maintenance'
+    STAPLE = 'staple'
+    OTHER = 'other'
+    KIND_CHOICES = [
+        (TONER, 'Toner'),
+        (DRUM, 'Drum'),
+        (WASTE, 'Waste container'),
+        (FUSER, 'Fuser'),
+        (MAINTENANCE, 'Maintenance kit'),
+        (STAPLE, 'Staples'),
+        (OTHER, 'Other'),
+    ]
+
+    printer = models.ForeignKey(Printer, on_delete=models.CASCADE, related_name='supply_readings')
+    description = models.CharField(max_length=255)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=OTHER)
+    percent = models.PositiveSmallIntegerField(null=True, blank=True)
+    level = models.IntegerField(null=True, blank=True)
+    max_capacity = models.IntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Start of the current low episode (percent <= SUPPLY_LOW_PERCENT), else null
+    low_since = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Last time a SupplyLevelSample was recorded for this reading
+    last_sampled_at = models.DateTimeField(null=True, blank=True)
+    # Filled in by tickets.forecasting.forecast_supplies()
+    depletion_rate_per_day = models.FloatField(null=True, blank=True, help_text="Percent consumed per day.")
+    predicted_empty_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Supply reading'
+        verbose_name_plural = 'Supply readings'
+        ordering = ['printer_id', 'description']
+        constraints = [
+            models.UniqueConstraint(fields=['printer', 'description'], name='uniq_supply_reading_printer_description'),
+        ]
+        indexes = [
+            models.Index(fields=['percent']),
+            models.Index(fields=['kind', 'percent']),
+        ]
+
+    def __str__(self):
+        pct = f"{self.percent}%" if self.percent is not None else 'n/a'
+        return f"{self.printer.campus_label} | {self.description} ({pct})"
+
+
+class SupplyLevelSample(models.Model):
+    """History of supply percentages used to fit depletion rates.
+
+    A sample is recorded when a reading changes or when the previous sample is
+    older than ``SUPPLY_SAMPLE_INTERVAL_HOURS``, so idle printers stay cheap.
+    """
+
+    printer = models.ForeignKey(Printer, on_delete=models.CASCADE, related_name='supply_samples')
+    description = models.CharField(max_length=255)
+    percent = models.PositiveSmallIntegerField()
+    recorded_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Supply level sample'
+        verbose_name_plural = 'Supply level samples'
+        indexes = [
+            models.Index(fields=['printer', 'description', 'recorded_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.printer_id} | {self.description} {self.percent}% at {self.recorded_at:%Y-%m-%d %H:%M}"
+
+
+class PrinterCondition(models.Model):
+    """A critical SNMP condition (jam, door open, offline, ...) active on a printer.
+
+    Rows exist only while the condition is reported; ``consecutive_polls``
+    counts how many polls in a row have seen it. Once it persists long enough
+    an ISSUE ticket is opened (or reused) and linked through ``ticket``.
+    """
+
+    printer = models.ForeignKey(Printer, on_delete=models.CASCADE, related_name='conditions')
+    code = models.CharField(max_length=100)
+    label = models.CharField(max_length=255)
+    consecutive_polls = models.PositiveIntegerField(default=1)
+    first_seen_at = models.DateTimeField()
+    last_seen_at = models.DateTimeField()
+    ticket = models.ForeignKey(
+        RequestTicket,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='conditions',
+    )
+
+    class Meta:
+        verbose_name = 'Printer condition'
+        verbose_name_plural = 'Printer conditions'
+        constraints = [
+            models.UniqueConstraint(fields=['printer', 'code'], name='uniq_printer_condition_code'),
+        ]
+
+    def __str__(self):
+        return f"{self.printer.campus_label} | {self.label} ({self.consecutive_polls} polls)"
+
+
+class FleetHealth(models.Model):
+    """Precomputed printer health counts for one PrinterGroup.
+
+    The row without a group holds the fleet-wide totals. Rows are refreshed
+    by ``tickets.fleet_health`` after polls and ticket changes, so dashboards
+    read counts instead of aggregating statuses on every page load.
+    """
+
+    group = models.OneToOneField(
+        PrinterGroup,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='health',
+    )
+    printer_count = models.PositiveIntegerField(default=0)
+    attention_count = models.PositiveIntegerField(default=0)
+    fault_count = models.PositiveIntegerField(default=0)
+    # Printers with attention or an SNMP fault (the admin "device alerts" list)
+    alert_count = models.PositiveIntegerField(default=0)
+    low_supply_count = models.PositiveIntegerField(default=0)
+    open_issue_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Fleet health'
+        verbose_name_plural = 'Fleet health'
+
+    def __str__(self):
+        scope = self.group.name if self.group_id else 'All printers'
+        return f"{scope}: {self.attention_count} attention, {self.fault_count} offline"
+
+
+class PrinterStateInterval(models.Model):
+    """A span of time a printer spent in one availability state.
+
+    Each poll either extends the open interval (``ended_at`` is null) or
+    closes it and opens a new one, so availability over any window is a range
+    query over a few rows per printer instead of a scan of poll history.
+    """
+
+    UP = 'up'
+    ATTENTION = 'attention'
+    DOWN = 'down'
+    UNREACHABLE = 'unreachable'
+    STATE_CHOICES = [
+        (UP, 'Up'),
+        (ATTENTION, 'Needs attention'),
+        (DOWN, 'Down'),
+        (UNREACHABLE, 'Unreachable'),
+    ]
+
+    printer = models.ForeignKey(Printer, on_delete=models.CASCADE, related_name='state_intervals')
+    state = models.CharField(max_length=20, choices=STATE_CHOICES)
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Printer state interval'
+        verbose_name_plural = 'Printer state intervals'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['printer'],
+                condition=models.Q(ended_at__isnull=True),
+                name='uniq_open_state_interval',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['printer', 'started_at'], name='state_interval_start_idx'),
+            models.Index(fields=['printer', 'ended_at'], name='state_interval_end_idx'),
+        ]
+
+    def __str__(self):
+        end = f"{self.ended_at:%Y-%m-%d %H:%M}" if self.ended_at else 'now'
+        return f"{self.printer_id} | {self.state} {self.started_at:%Y-%m-%d %H:%M} - {end}"
+
+
+class PollLease(models.Model):
+    """Short-lived claim on polling one printer.
+
+    Pollers in different threads and processes claim printers here before
+    querying SNMP so each printer is polled by one of them at a time. A lease
+    is free once ``expires_at`` has passed.
+    """
+
+    printer = models.OneToOneField(Printer, on_delete=models.CASCADE, primary_key=True, related_name='poll_lease')
+    owner = models.CharField(max_length=100, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Poll lease'
+        verbose_name_plural = 'Poll leases'
+
+    def __str__(self):
+        return f"{self.printer_id} | {self.owner or 'free'} until {self.expires_at:%Y-%m-%d %H:%M:%S}"
+
+
+class OutboxEmail(models.Model):
+    """An email waiting to be delivered (transactional outbox).
+
+    Rows are written in the same transaction as the change they announce, so
+    a committed ticket always has its notification queued; ``tickets.outbox``
+    delivers them in batches and retries failures with backoff.
+    """
+
+    PENDING = 'PENDING'
+    SENT = 'SENT'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    ticket = models.ForeignKey(
+        RequestTicket,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='emails',
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Set while a delivery worker holds the row; see outbox.deliver_outbox
+    claim_token = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Outbox email'
+        verbose_name_plural = 'Outbox emails'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
+class ConsumableCompatibility(models.Model):
+    """An InventoryItem fits every printer of a make and model (pattern).
+
+    ``model_pattern`` accepts shell-style wildcards (``e-STUDIO 4*``); both
+    fields match case-insensitively. ``tickets.compatibility`` combines these
+    rules with the item's per-printer overrides into a cached lookup.
+    """
+
+    item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name='compatibility_rules')
+    make = models.CharField(max_length=100, help_text="Printer make, e.g. 'Toshiba'.")
+    model_pattern = models.CharField(
+        max_length=100,
+        help_text="Printer model, or a pattern such as 'e-STUDIO 4*' ('*' matches anything).",
+    )
+
+    class Meta:
+        verbose_name = 'Compatibility rule'
+        verbose_name_plural = 'Compatibility rules'
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'make', 'model_pattern'], name='uniq_item_make_model_pattern'),
+        ]
+
+    def __str__(self):
+        return f"{self.item.name} fits {self.make} {self.model_pattern}"
+
+
+class SupplyLine(models.Model):
+    """One requested item on a SUPPLY ticket.
+
+    ``item`` is set for inventory items; free-text requests ("Other / Not
+    listed", paper) only have a ``description``. The description is a
+    snapshot of the label at order time, so it survives item renames.
+    """
+
+    ticket = models.ForeignKey(RequestTicket, on_delete=models.CASCADE, related_name='supply_lines')
+    item = models.ForeignKey(
+        InventoryItem,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='supply_lines',
+    )
+    description = models.CharField(max_length=255)
+    quantity = models.PositiveIntegerField(default=1)
+    # Part of ``quantity`` held in InventoryItem.quantity_reserved until the
+    # ticket is fulfilled (consumed) or closed (released)
+    reserved_quantity = models.PositiveIntegerField(default=0)
+    position = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        ordering = ['ticket', 'position']
+        verbose_name = 'Supply line'
+        verbose_name_plural = 'Supply lines'
+        indexes = [
+            models.Index(fields=['item', 'ticket'], name='supplyline_item_ticket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.description} (qty {self.quantity})"
+
+
+class InventoryScanReceipt(models.Model):
+    """Idempotency key of a scan already applied by the batch scan endpoint.
+
+    Scanner pages queue scans offline and may resend a batch after a dropped
+    response; scans whose key is already here are skipped.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    item = models.ForeignKey(
+        InventoryItem,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='scan_receipts',
+    )
+    delta = models.SmallIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = 'Inventory scan receipt'
+        verbose_name_plural = 'Inventory scan receipts'
+
+    def __str__(self):
+        return f"{self.key} ({self.delta:+d})"
+
+
+class InventoryTransaction(models.Model):
+    """Append-only ledger of stock changes.
+
+    One row per adjustment, written in the same transaction as the UPDATE of
+    ``InventoryItem.quantity_on_hand``. Negative deltas are consumption;
+    ``destination`` is the free-text "To" of scanner check-outs or the
+    printer a fulfilled ticket was for.
+    """
+
+    SCAN = 'scan'
+    BATCH_SCAN = 'batch_scan'
+    FULFILMENT = 'fulfilment'
+    SOURCE_CHOICES = [
+        (SCAN, 'Scanner'),
+        (BATCH_SCAN, 'Scanner (offline batch)'),
+        (FULFILMENT, 'Ticket fulfilled'),
+    ]
+
+    item = models.ForeignKey(
+        InventoryItem,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='transactions',
+    )
+    delta = models.IntegerField()
+    quantity_before = models.PositiveIntegerField()
+    quantity_after = models.PositiveIntegerField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='inventory_transactions',
+    )
+    destination = models.CharField(max_length=200, blank=True)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    ticket = models.ForeignKey(
+        RequestTicket,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='inventory_transactions',
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Inventory transaction'
+        verbose_name_plural = 'Inventory transactions'
+        indexes = [
+            models.Index(fields=['item', 'created_at'], name='invtxn_item_time_idx'),
+            models.Index(fields=['created_at'], name='invtxn_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} {self.delta:+d} ({self.quantity_before} -> {self.quantity_after}) {self.source}"
@@ -0,0 +1,214 @@
+"""Transactional email outbox.
+
+``queue_email`` writes an OutboxEmail row inside the caller's transaction and
+schedules delivery for after commit. ``deliver_outbox`` sends due rows in
+batches over one SMTP connection; failures are retried with exponential
+backoff until ``EMAIL_OUTBOX_MAX_ATTEMPTS`` is reached. The
+``deliver_outbox`` management command drains anything left behind (for
+example after an SMTP outage or a restart). In-process delivery runs on the
+shared mail worker pool (``mail_worker``).
+"""
+from __future__ import annotations
+
+import logging
+import smtplib
+import uuid
+from datetime import timedelta
+from typing import Iterable
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .mail_worker import mail_pool
+from .models import OutboxEmail, RequestTicket
+
+OUTBOX_BATCH_SIZE = max(1, int(getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)))
+OUTBOX_MAX_ATTEMPTS = max(1, int(getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 8)))
+# Retry delays: 1, 2, 4, ... minutes, capped at six hours.
+RETRY_BASE = timedelta(minutes=1)
+RETRY_MAX = timedelta(hours=6)
+# A claimed row becomes due again after this long if its worker died.
+CLAIM_TIMEOUT = timedelta(minutes=5)
+# Errors that mean the connection itself is gone, not that one message was refused.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+logger = logging.getLogger(__name__)
+
+
+def queue_email(
+    subject: str,
+    body: str,
+    recipients: Iterable[str],
+    *,
+    ticket: RequestTicket | None = None,
+    from_email: str | None = None,
+) -> OutboxEmail:
+    """Add an email to the outbox; it is delivered once the transaction commits."""
+    email = OutboxEmail.objects.create(
+        subject=subject[:255],
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients),
+        ticket=ticket,
+    )
+    transaction.on_commit(kick_delivery)
+    return email
+
+
+def queue_ticket_email(ticket: RequestTicket, printer, scope_label: str) -> OutboxEmail:
+    """Queue the Printing Services notification for a new ticket.
+
+    Call inside the transaction that saves the ticket so both commit together.
+    """
+    body_lines = [
+        f"Printer: {printer.campus_label} | {printer.asset_tag}",
+        f"Location: {printer.building} / {printer.location_in_building}",
+        f"Make/Model: {printer.make} {printer.model}",
+        f"IP/MAC: {printer.ip_address} / {printer.mac_address}",
+        "",
+        f"Scope: {scope_label}",
+        f"Requester: {ticket.requester_name} <{ticket.requester_email}>",
+        "",
+        "Details:",
+        ticket.details or "(none)",
+    ]
+    if ticket.applies_to_group and ticket.group:
+        body_lines.append("")
+        body_lines.append("Group members:")
+        for member in ticket.group.printers.order_by('campus_label'):
+            body_lines.append(
+                f"  - {member.campus_label} | {member.asset_tag} | {member.location_in_building}"
+            )
+    subject = f"[{ticket.type}] {printer.campus_label} ({printer.asset_tag})"
+    return queue_email(subject, "\n".join(body_lines), settings.EMAIL_TO or ["sklarz@berea.edu"], ticket=ticket)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return min(RETRY_BASE * (2 ** max(0, attempts - 1)), RETRY_MAX)
+
+
+def _record_failure(email: OutboxEmail, exc: Exception, now) -> None:
+    email.attempts += 1
+    email.last_error = f"{type(exc).__name__}: {exc}"[:2000]
+    email.claim_token = ''
+    if email.attempts >= OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboxEmail.FAILED
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+
+def _claim_batch(batch_size: int, now) -> list[OutboxEmail]:
+    due_ids = list(
+        OutboxEmail.objects.filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'pk')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    if not due_ids:
+        return []
+    token = uuid.uuid4().hex
+    # Conditional UPDATE: concurrent workers cannot claim the same row.
+    OutboxEmail.objects.filter(
+        pk__in=due_ids,
+        status=OutboxEmail.PENDING,
+        next_attempt_at__lte=now,
+    ).update(claim_token=token, next_attempt_at=now + CLAIM_TIMEOUT)
+    return list(OutboxEmail.objects.filter(pk__in=due_ids, claim_token=token).order_by('pk'))
+
+
+def deliver_outbox(batch_size: int | None = None, *, connection=None) -> dict:
+    """Send one batch of due emails over a single mail connection.
+
+    A ``connection`` passed in is left open for the caller to reuse. Returns counts of ``sent``, ``retrying`` and ``failed`` (given up) emails.
+    """
+    now = timezone.now()
+    emails = _claim_batch(batch_size or OUTBOX_BATCH_SIZE, now)
+    summary = {'sent': 0, 'retrying': 0, 'failed': 0}
+    if not emails:
+        return summary
+
+    mail_connection = connection or get_connection(fail_silently=False)
+    try:
+        mail_connection.open()
+    except Exception as exc:
+        logger.warning("Email outbox: could not open mail connection: %s", exc)
+        for email in emails:
+            _record_failure(email, exc, now)
+    else:
+        try:
+            for index, email in enumerate(emails):
+                message = EmailMessage(
+                    email.subject,
+                    email.body,
+                    email.from_email,
+                    email.recipients,
+                    connection=mail_connection,
+                )
+                try:
+                    mail_connection.send_messages([message])
+                except CONNECTION_ERRORS as exc:
+                    logger.warning("Email outbox: connection lost sending %s: %s", email.pk, exc)
+                    _record_failure(email, exc, now)
+                    # Reconnect once (the worker pool keeps using this
+                    # connection object); if that fails, the rest of the
+                    # batch fails without being tried on a dead socket.
+                    try:
+                        mail_connection.close()
+                        mail_connection.open()
+                    except Exception as reopen_exc:
+                        logger.warning("Email outbox: could not reopen mail connection: %s", reopen_exc)
+                        for remaining in emails[index + 1:]:
+                            _record_failure(remaining, reopen_exc, now)
+                        break
+                except Exception as exc:
+                    logger.warning("Email outbox: sending %s failed: %s", email.pk, exc)
+                    _record_failure(email, exc, now)
+                else:
+                    email.status = OutboxEmail.SENT
+                    email.sent_at = timezone.now()
+                    email.attempts += 1
+                    email.claim_token = ''
+                    email.last_error = ''
+        finally:
+            if connection is None:
+                mail_connection.close()
+
+    OutboxEmail.objects.bulk_update(
+        emails,
+        ['status', 'attempts', 'next_attempt_at', 'claim_token', 'last_error', 'sent_at'],
+    )
+    for email in emails:
+        if email.status == OutboxEmail.SENT:
+            summary['sent'] += 1
+        elif email.status == OutboxEmail.FAILED:
+            summary['failed'] += 1
+        else:
+            summary['retrying'] += 1
+    return summary
+
+
+def drain_outbox(max_batches: int = 20, *, connection=None) -> dict:
+    """Deliver batches until nothing is due (or ``max_batches`` were sent)."""
+    totals = {'sent': 0, 'retrying': 0, 'failed': 0}
+    for _ in range(max_batches):
+        summary = deliver_outbox(connection=connection)
+        for key, value in summary.items():
+            totals[key] += value
+        if not any(summary.values()):
+            break
+    return totals
+
+
+def _drain_job(connection) -> tuple[int, int]:
+    totals = drain_outbox(connection=connection)
+    return totals['sent'], totals['retrying'] + totals['failed']
+
+
+def kick_delivery() -> None:
+    """Drain the outbox on the mail worker pool.
+
+    Kicks coalesce while a drain is still queued; if the queue is full the
+    rows stay pending for the next kick or the ``deliver_outbox`` command.
+    """
+    mail_pool.submit(_drain_job, key='outbox')
@@ -0,0 +1,73 @@
+"""Cached index of the printer groups and printers each manager may manage.
+
+``managed_ids(user)`` reads two id sets from the cache (and memoizes them on
+the user object for the rest of the request), so permission checks are set
+lookups instead of a ``group.managers`` query each. Keys carry a generation
+number that ``invalidate_manager_permissions`` bumps when group managers
+change or printers move between groups (see ``tickets/signals.py``).
+
+The generation lives in the same cache, so a bump is only seen by processes
+that share it. With the default per-process locmem cache, other server
+processes keep revoked access until their entry expires
+(``MANAGER_PERMISSION_CACHE_SECONDS``). Deployments with more than one
+process need a shared ``CACHES`` backend.
+"""
+from __future__ import annotations
+
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Printer
+
+MANAGER_PERMISSION_CACHE_SECONDS = int(getattr(settings, 'MANAGER_PERMISSION_CACHE_SECONDS', 30))
+
+_VERSION_KEY = 'perm:managed:version'
+
+
+class ManagedIds(NamedTuple):
+    group_ids: frozenset[int]
+    printer_ids: frozenset[int]
+
+
+def _version() -> int:
+    return cache.get_or_set(_VERSION_KEY, 1, None)
+
+
+def invalidate_manager_permissions() -> None:
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.set(_VERSION_KEY, 2, None)
+
+
+def _load(user) -> ManagedIds:
+    group_ids = frozenset(user.managed_printer_groups.values_list('pk', flat=True))
+    printer_ids = frozenset(Printer.objects.filter(group_id__in=group_ids).values_list('pk', flat=True))
+    return ManagedIds(group_ids, printer_ids)
+
+
+def managed_ids(user) -> ManagedIds:
+    if not getattr(user, 'is_authenticated', False):
+        return ManagedIds(frozenset(), frozenset())
+    version = _version()
+    memo = getattr(user, '_managed_ids', None)
+    if memo is not None and memo[0] == version:
+        return memo[1]
+    key = f"perm:managed:{version}:{user.pk}"
+    ids = cache.get(key) if MANAGER_PERMISSION_CACHE_SECONDS > 0 else None
+    if ids is None:
+        ids = _load(user)
+        if MANAGER_PERMISSION_CACHE_SECONDS > 0:
+            cache.set(key, ids, MANAGER_PERMISSION_CACHE_SECONDS)
+    user._managed_ids = (version, ids)
+    return ids
+
+
+def can_manage_group(user, group_id) -> bool:
+    return group_id is not None and group_id in managed_ids(user).group_ids
+
+
+def can_manage_printer(user, printer: Printer) -> bool:
+    return can_manage_group(user, printer.group_id)
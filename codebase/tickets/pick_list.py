@@ -0,0 +1,88 @@
+"""Pick lists for pending SUPPLY tickets.
+
+All inventory lines of New/In Progress tickets are summed per InventoryItem,
+so an item ordered by 50 tickets is one pick. Picks are ordered along a
+serpentine route through the stock room: rows in order, walking up the
+columns of one row and back down the next, so the whole list is one pass.
+The database does the shelf sort; items without a shelf location come last.
+"""
+from __future__ import annotations
+
+from typing import Iterable, NamedTuple
+
+from django.db.models import Sum
+
+from .models import InventoryItem, RequestTicket, SupplyLine
+
+
+class Pick(NamedTuple):
+    item: InventoryItem
+    quantity: int
+    ticket_ids: list[int]
+
+
+class PickList(NamedTuple):
+    picks: list[Pick]
+    # Lines without an inventory item ("Other / not listed", paper): (description, quantity, ticket ids)
+    unmatched: list[tuple[str, int, list[int]]]
+    ticket_ids: list[int]
+
+
+def serpentine(picks: Iterable[Pick]) -> list[Pick]:
+    """Alternate the column direction per visited row.
+
+    ``picks`` must already be in shelf order (``InventoryItem.objects.in_shelf_order()``).
+    """
+    rows: list[list[Pick]] = []
+    unshelved: list[Pick] = []
+    for pick in picks:
+        if not pick.item.shelf_row or pick.item.shelf_column is None:
+            unshelved.append(pick)
+        elif rows and rows[-1][0].item.shelf_row.upper() == pick.item.shelf_row.upper():
+            rows[-1].append(pick)
+        else:
+            rows.append([pick])
+
+    route: list[Pick] = []
+    for visit, stops in enumerate(rows):
+        if visit % 2:
+            # Walk back down the aisle; same-shelf items keep name order.
+            stops.sort(key=lambda p: -p.item.shelf_column)
+        route.extend(stops)
+    return route + unshelved
+
+
+def build_pick_list(ticket_ids: Iterable[int] | None = None) -> PickList:
+    """Pick list for the given tickets (default: every pending SUPPLY ticket).
+
+    Only tickets that are still New/In Progress are included.
+    """
+    lines = SupplyLine.objects.filter(
+        ticket__type=RequestTicket.SUPPLY,
+        ticket__status__in=RequestTicket.PENDING_STATUSES,
+    )
+    if ticket_ids is not None:
+        lines = lines.filter(ticket_id__in=list(ticket_ids))
+
+    totals: dict[int, int] = {}
+    tickets_by_item: dict[int, set[int]] = {}
+    unmatched: dict[str, list] = {}
+    all_tickets: set[int] = set()
+    rows = lines.values('item_id', 'description', 'ticket_id').annotate(total=Sum('quantity')).order_by()
+    for row in rows:
+        all_tickets.add(row['ticket_id'])
+        if row['item_id']:
+            totals[row['item_id']] = totals.get(row['item_id'], 0) + row['total']
+            tickets_by_item.setdefault(row['item_id'], set()).add(row['ticket_id'])
+        else:
+            entry = unmatched.setdefault(row['description'], [0, set()])
+            entry[0] += row['total']
+            entry[1].add(row['ticket_id'])
+
+    items = InventoryItem.objects.filter(pk__in=list(totals)).in_shelf_order()
+    picks = serpentine(Pick(item, totals[item.pk], sorted(tickets_by_item[item.pk])) for item in items)
+    return PickList(
+        picks=picks,
+        unmatched=[(desc, qty, sorted(ids)) for desc, (qty, ids) in sorted(unmatched.items())],
+        ticket_ids=sorted(all_tickets),
+    )
@@ -0,0 +1,81 @@
+"""Claim printers before polling so concurrent pollers split the fleet.
+
+PostgreSQL claims with ``SELECT ... FOR UPDATE SKIP LOCKED``, so competing
+pollers never wait on each other's rows. Databases without SKIP LOCKED
+(SQLite) use a single conditional UPDATE tagged with a per-claim token and
+read back which rows carry that token.
+"""
+from __future__ import annotations
+
+import os
+import socket
+import uuid
+from datetime import timedelta
+from typing import Iterable
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import PollLease
+
+LEASE_SECONDS = max(5, int(getattr(settings, 'SNMP_POLL_LEASE_SECONDS', 60)))
+
+_HOST_PID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _new_token() -> str:
+    return f"{_HOST_PID}:{uuid.uuid4().hex[:12]}"[:100]
+
+
+def claim_printers(printer_ids: Iterable[int], *, seconds: int | None = None) -> tuple[set[int], str]:
+    """Claim free leases for ``printer_ids``.
+
+    Returns ``(claimed_ids, token)``; pass the token to ``release_leases``
+    once polling is done. Printers leased by another poller are left out.
+    """
+    ids = sorted(set(printer_ids))
+    token = _new_token()
+    if not ids:
+        return set(), token
+    now = timezone.now()
+    expires = now + timedelta(seconds=seconds or LEASE_SECONDS)
+
+    # Make sure every printer has a lease row to claim.
+    PollLease.objects.bulk_create(
+        [PollLease(printer_id=pk, expires_at=now) for pk in ids],
+        ignore_conflicts=True,
+    )
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            free = list(
+                PollLease.objects.select_for_update(skip_locked=True)
+                .filter(printer_id__in=ids, expires_at__lte=now)
+                .values_list('printer_id', flat=True)
+            )
+            if free:
+                PollLease.objects.filter(printer_id__in=free).update(owner=token, expires_at=expires)
+        return set(free), token
+
+    PollLease.objects.filter(printer_id__in=ids, expires_at__lte=now).update(owner=token, expires_at=expires)
+    claimed = set(PollLease.objects.filter(printer_id__in=ids, owner=token).values_list('printer_id', flat=True))
+    return claimed, token
+
+
+def leased_printers(printer_ids: Iterable[int]) -> set[int]:
+    """Ids among ``printer_ids`` whose lease is currently held by some poller."""
+    ids = list(printer_ids)
+    if not ids:
+        return set()
+    return set(
+        PollLease.objects.filter(printer_id__in=ids, expires_at__gt=timezone.now())
+        .values_list('printer_id', flat=True)
+    )
+
+
+def release_leases(printer_ids: Iterable[int], token: str) -> None:
+    """Free leases held under ``token`` (leases taken over by others are untouched)."""
+    ids = list(printer_ids)
+    if ids:
+        PollLease.objects.filter(printer_id__in=ids, owner=token).update(owner='', expires_at=timezone.now())
@@ -0,0 +1,59 @@
+"""Cache for the public QR portal (``printer_portal``).
+
+Keys carry a generation number that is bumped whenever a Printer or
+PrinterGroup is saved or deleted (see ``tickets/signals.py``), so every cached
+portal is invalidated at once without tracking which tokens a change affects.
+With the default per-process cache, other server processes see the change
+once their entries expire; configure a shared ``CACHES`` backend to make
+invalidation immediate everywhere.
+"""
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from .models import Printer
+
+PORTAL_CACHE_SECONDS = int(getattr(settings, 'PORTAL_CACHE_SECONDS', 600))
+
+_VERSION_KEY = 'portal:version'
+
+
+def _version() -> int:
+    return cache.get_or_set(_VERSION_KEY, 1, None)
+
+
+def invalidate_portal_cache() -> None:
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.set(_VERSION_KEY, 2, None)
+
+
+def portal_context(qr_token) -> dict:
+    """Printer and group member list for a QR token, cached; raises Http404."""
+    key = f"portal:printer:{_version()}:{qr_token}"
+    context = cache.get(key) if PORTAL_CACHE_SECONDS > 0 else None
+    if context is None:
+        printer = Printer.objects.select_related('group').filter(qr_token=qr_token).first()
+        if printer is None:
+            raise Http404('No printer matches this QR code.')
+        group_printers = None
+        if printer.group:
+            group_printers = list(printer.group.printers.order_by('campus_label'))
+        context = {'printer': printer, 'group_printers': group_printers}
+        if PORTAL_CACHE_SECONDS > 0:
+            cache.set(key, context, PORTAL_CACHE_SECONDS)
+    return dict(context)
+
+
+def get_cached_portal_page(qr_token) -> bytes | None:
+    if PORTAL_CACHE_SECONDS <= 0:
+        return None
+    return cache.get(f"portal:page:{_version()}:{qr_token}")
+
+
+def set_cached_portal_page(qr_token, content: bytes) -> None:
+    if PORTAL_CACHE_SECONDS > 0:
+        cache.set(f"portal:page:{_version()}:{qr_token}", content, PORTAL_CACHE_SECONDS)
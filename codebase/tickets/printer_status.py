@@ -1,25 +1,219 @@
 from __future__ import annotations
 
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from typing import Iterable
 
 from django.conf import settings
+from django.db import connection
 from django.utils import timezone
 
+from .auto_tickets import evaluate_alert_rules, evaluate_supply_rules
+from .availability import record_state_transitions
+from .fleet_health import refresh_fleet_health_for_printers
 from .models import Printer, PrinterStatus
+from .poll_leases import claim_printers, leased_printers, release_leases
 from .snmp_client import SnmpNotConfigured, SnmpQueryError, fetch_printer_status
+from .status_events import publish_status_changes
+from .supplies import supply_forecast_map, sync_supply_readings
 
 POLL_INTERVAL_SECONDS = int(getattr(settings, 'SNMP_POLL_INTERVAL_SECONDS', 300))
+# Concurrent SNMP polls for refresh_statuses_concurrently (per process).
+REFRESH_WORKERS = max(1, int(getattr(settings, 'SNMP_REFRESH_WORKERS', 8)))
+# How long manager_status_feed waits for those polls before answering.
+FEED_BUDGET_SECONDS = max(0.0, float(getattr(settings, 'STATUS_FEED_BUDGET_SECONDS', 3)))
+
+logger = logging.getLogger(__name__)
+
+
+def _is_fresh(status: PrinterStatus) -> bool:
+    if not status.fetched_at:
+        return False
+    age = timezone.now() - status.fetched_at
+    return age.total_seconds() < POLL_INTERVAL_SECONDS
 
 
 def ensure_latest_status(printer: Printer, *, force: bool = False) -> PrinterStatus:
-    """Return the latest SNMP status for a printer, refreshing if needed."""
+    """Return the latest SNMP status for a printer, refreshing if needed.
+
+    If another poller holds the printer's lease the stored status is returned
+    as is; that poller will save the fresh one.
+    """
     status, _ = PrinterStatus.objects.get_or_create(printer=printer)
 
-    if not force and status.fetched_at:
-        age = timezone.now() - status.fetched_at
-        if age.total_seconds() < POLL_INTERVAL_SECONDS:
+    if not force and _is_fresh(status):
+        return status
+
+    claimed, token = claim_printers([printer.id])
+    if not claimed:
+        # Another thread or process is polling this printer right now.
+        return status
+    try:
+        _poll_into(printer, status)
+    finally:
+        release_leases(claimed, token)
+    after_poll_batch([status])
+    return status
+
+
+def refresh_statuses(printers: Iterable[Printer], *, force: bool = False) -> list[PrinterStatus]:
+    """Batch form of ensure_latest_status; returns statuses in printer order.
+
+    Post-poll processing (supply readings, automatic tickets, ...) runs once
+    for the whole batch instead of once per printer.
+    """
+    printer_list = list(printers)
+    if not printer_list:
+        return []
+    status_map = {
+        ps.printer_id: ps
+        for ps in PrinterStatus.objects.filter(printer__in=printer_list)
+    }
+    for printer in printer_list:
+        if printer.id not in status_map:
+            status_map[printer.id], _ = PrinterStatus.objects.get_or_create(printer=printer)
+    due = [printer for printer in printer_list if force or not _is_fresh(status_map[printer.id])]
+
+    # One unreachable printer can take ~20s (timeouts and retries over v2c and
+    # v1), so each lease is claimed right before its poll rather than all up
+    # front, where the later ones would expire while the batch is still running.
+    # Printers leased by another poller keep their current status here.
+    polled: list[PrinterStatus] = []
+    for printer in due:
+        claimed, token = claim_printers([printer.id])
+        if not claimed:
+            continue
+        try:
+            _poll_into(printer, status_map[printer.id])
+            polled.append(status_map[printer.id])
+        finally:
+            release_leases(claimed, token)
+    after_poll_batch(polled)
+    return [status_map[printer.id] for printer in printer_list]
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+# printer id -> poll currently running in the pool, shared by all requests
+_in_flight: dict[int, Future] = {}
+
+
+def _poll_in_worker(printer: Printer) -> PrinterStatus:
+    try:
+        status, _ = PrinterStatus.objects.get_or_create(printer=printer)
+        # The lease is claimed here rather than when the poll is queued: a poll
+        # can wait behind slow ones longer than the lease lasts, and another
+        # poller may have taken the printer meanwhile. It then saves the result.
+        claimed, token = claim_printers([printer.id])
+        if not claimed:
             return status
+        try:
+            _poll_into(printer, status)
+        finally:
+            release_leases(claimed, token)
+        after_poll_batch([status])
+        return status
+    finally:
+        with _executor_lock:
+            _in_flight.pop(printer.id, None)
+        # Worker threads get their own connection; don't leave it open.
+        connection.close()
 
+
+def _submit_poll(printer: Printer) -> Future:
+    global _executor
+    with _executor_lock:
+        future = _in_flight.get(printer.id)
+        if future is not None:
+            return future
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix='snmp-refresh')
+        future = _executor.submit(_poll_in_worker, printer)
+        _in_flight[printer.id] = future
+        return future
+
+
+def refresh_statuses_concurrently(
+    printers: Iterable[Printer],
+    *,
+    force: bool = False,
+    budget_seconds: float | None = None,
+) -> tuple[list[PrinterStatus], set[int]]:
+    """Poll stale (or all, with ``force``) printers in a thread pool.
+
+    Waits at most ``budget_seconds`` (``None`` waits for every poll, ``0``
+    returns immediately). Returns the statuses in printer order plus the ids
+    of printers whose poll is still running; those keep their previous
+    status here and are saved (and announced to status streams) when the
+    poll finishes. A printer already being polled (by another request, or
+    by another thread or process holding its PollLease) is reported as
+    pending rather than polled twice.
+    """
+    printer_list = list(printers)
+    if not printer_list:
+        return [], set()
+    status_map = {
+        ps.printer_id: ps
+        for ps in PrinterStatus.objects.filter(printer__in=printer_list)
+    }
+    futures: dict[int, Future] = {}
+    due: list[Printer] = []
+    for printer in printer_list:
+        status = status_map.get(printer.id)
+        if status is None:
+            status, _ = PrinterStatus.objects.get_or_create(printer=printer)
+            status_map[printer.id] = status
+        with _executor_lock:
+            running = _in_flight.get(printer.id)
+        if running is not None:
+            futures[printer.id] = running
+        elif force or not _is_fresh(status):
+            due.append(printer)
+
+    # Leased elsewhere: the other poller saves the result, so report it as pending.
+    pending = leased_printers(printer.id for printer in due)
+    for printer in due:
+        if printer.id not in pending:
+            futures[printer.id] = _submit_poll(printer)
+
+    if futures and budget_seconds != 0:
+        wait(list(futures.values()), timeout=budget_seconds)
+
+    for printer_id, future in futures.items():
+        if not future.done():
+            pending.add(printer_id)
+        elif future.exception() is None:
+            status_map[printer_id] = future.result()
+        else:
+            logger.error("Status refresh for printer %s failed", printer_id, exc_info=future.exception())
+    return [status_map[printer.id] for printer in printer_list], pending
+
+
+def after_poll_batch(statuses: list[PrinterStatus]) -> None:
+    """Derived-data hooks for freshly polled statuses.
+
+    Failures are logged rather than raised so a bad rule never breaks the
+    status feed itself.
+    """
+    if not statuses:
+        return
+    printer_ids = [s.printer_id for s in statuses]
+    for hook, arg in (
+        (sync_supply_readings, statuses),
+        (record_state_transitions, statuses),
+        (evaluate_supply_rules, printer_ids),
+        (evaluate_alert_rules, statuses),
+        (refresh_fleet_health_for_printers, printer_ids),
+        (publish_status_changes, statuses),
+    ):
+        try:
+            hook(arg)
+        except Exception:
+            logger.exception("Post-poll hook %s failed", hook.__name__)
+
+
+def _poll_into(printer: Printer, status: PrinterStatus) -> None:
     try:
         snapshot = fetch_printer_status(printer)
     except SnmpNotConfigured as exc:
@@ -33,11 +227,20 @@ def ensure_latest_status(printer: Printer, *, force: bool = False) -> PrinterSta
 
     status.fetched_at = timezone.now()
     status.save()
-    return status
 
 
 
-def build_status_payload(printer: Printer, status: PrinterStatus | None) -> dict:
+def build_status_payload(
+    printer: Printer,
+    status: PrinterStatus | None,
+    *,
+    forecasts: dict[int, dict[str, dict]] | None = None,
+) -> dict:
+    """Serialize a printer and its status for JSON feeds and templates.
+
+    ``forecasts`` is the output of ``supply_forecast_map``; pass it when
+    building payloads for many printers to avoid one query per printer.
+    """
     if status:
         base_status = status.as_dict()
     else:
@@ -67,6 +270,21 @@ def build_status_payload(printer: Printer, status: PrinterStatus | None) -> dict
 
     base_status['display_timestamp'] = display_ts
 
+    if base_status['supplies']:
+        if forecasts is None:
+            forecasts = supply_forecast_map([printer.id])
+        printer_forecasts = forecasts.get(printer.id, {})
+        base_status['supplies'] = [
+            {
+                **supply,
+                'depletion_rate_per_day': None,
+                'predicted_empty_at': None,
+                **printer_forecasts.get((supply.get('description') or '').strip(), {}),
+            }
+            if isinstance(supply, dict) else supply
+            for supply in base_status['supplies']
+        ]
+
     return {
         'printer': {
             'id': printer.id,
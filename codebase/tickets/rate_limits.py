@@ -0,0 +1,121 @@
+"""Sliding-window rate limits kept in Django's cache.
+
+Each rule counts hits in fixed buckets of ``window`` seconds and estimates the
+sliding-window total as ``current + previous * (unexpired share of previous)``,
+which needs two cache keys per identity and no database queries. Limits are
+per process with the default locmem cache; configure a shared ``CACHES``
+backend to enforce them across server processes.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def parse_rate(value) -> tuple[int, int] | None:
+    """``'3/3600'`` -> ``(3, 3600)``; empty or zero disables the rule."""
+    if not value:
+        return None
+    if isinstance(value, (tuple, list)):
+        limit, window = value
+    else:
+        limit, _, window = str(value).partition('/')
+    try:
+        limit, window = int(limit), int(window or 3600)
+    except ValueError:
+        return None
+    if limit <= 0 or window <= 0:
+        return None
+    return limit, window
+
+
+# Scope -> (max hits, window seconds) for public issue reports
+ISSUE_RATE_LIMITS = {
+    scope: rate
+    for scope, rate in {
+        'printer': parse_rate(getattr(settings, 'ISSUE_RATE_LIMIT_PER_PRINTER', '3/3600')),
+        'ip': parse_rate(getattr(settings, 'ISSUE_RATE_LIMIT_PER_IP', '10/3600')),
+        'email': parse_rate(getattr(settings, 'ISSUE_RATE_LIMIT_PER_EMAIL', '5/3600')),
+    }.items()
+    if rate is not None
+}
+
+
+def _bucket_key(name: str, scope: str, identity: str, bucket: int) -> str:
+    digest = hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]
+    return f"ratelimit:{name}:{scope}:{digest}:{bucket}"
+
+
+def _estimate(name: str, scope: str, identity: str, window: int, now: float) -> tuple[float, str]:
+    bucket = int(now // window)
+    current_key = _bucket_key(name, scope, identity, bucket)
+    previous_key = _bucket_key(name, scope, identity, bucket - 1)
+    counts = cache.get_many([current_key, previous_key])
+    elapsed = (now % window) / window
+    estimate = counts.get(current_key, 0) + counts.get(previous_key, 0) * (1.0 - elapsed)
+    return estimate, current_key
+
+
+def hit(name: str, identities: dict[str, str | None], rates: dict[str, tuple[int, int]]) -> bool:
+    """Count one attempt against every scope; returns False if any limit is reached.
+
+    ``identities`` maps scope -> identity (printer id, IP, email); scopes with
+    no identity or no configured rate are skipped. Rejected attempts are not
+    counted, so a blocked sender recovers as the window slides.
+    """
+    now = time.time()
+    pending: list[tuple[str, int]] = []
+    for scope, identity in identities.items():
+        rate = rates.get(scope)
+        if rate is None or not identity:
+            continue
+        limit, window = rate
+        estimate, key = _estimate(name, scope, identity, window, now)
+        if estimate + 1 > limit:
+            return False
+        pending.append((key, window))
+    for key, window in pending:
+        # Keep the bucket alive through the following window, where it is "previous".
+        if not cache.add(key, 1, window * 2):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, window * 2)
+    return True
+
+
+# Addresses of reverse proxies whose X-Forwarded-For is believed; empty means
+# the header is ignored, since any client can send it.
+TRUSTED_PROXIES = frozenset(getattr(settings, 'RATE_LIMIT_TRUSTED_PROXIES', ()) or ())
+
+
+def client_ip(request) -> str:
+    """Client address; X-Forwarded-For is only read from a trusted proxy.
+
+    Walks the header right to left past trusted proxies, so entries a client
+    prepended itself are never used.
+    """
+    remote = request.META.get('REMOTE_ADDR', '')
+    if remote not in TRUSTED_PROXIES:
+        return remote
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()]
+    for hop in reversed(hops):
+        if hop not in TRUSTED_PROXIES:
+            return hop
+    return remote
+
+
+def allow_issue_report(request, printer, email: str | None = None) -> bool:
+    return hit(
+        'issue',
+        {
+            'printer': str(printer.pk),
+            'ip': client_ip(request),
+            'email': (email or '').strip().lower() or None,
+        },
+        ISSUE_RATE_LIMITS,
+    )
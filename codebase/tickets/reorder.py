@@ -0,0 +1,108 @@
+"""Suggested reorder thresholds from the InventoryTransaction ledger.
+
+Daily usage of each item (scan-outs and fulfilled supply orders, i.e. every
+removal in the ledger) over the last ``REORDER_WINDOW_DAYS`` is binned into
+an item x day matrix in one NumPy pass. The suggested threshold covers the
+expected use during the restocking lead time plus safety stock for its
+variability::
+
+    rate * lead_time + z * stddev * sqrt(lead_time)
+
+Suggestions are stored on the item; ``reorder_threshold`` itself is only
+changed from the admin ("Apply suggested reorder thresholds").
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import InventoryItem, InventoryTransaction
+
+try:
+    import numpy as np  # type: ignore
+    HAVE_NUMPY = True
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+    HAVE_NUMPY = False
+
+REORDER_WINDOW_DAYS = int(getattr(settings, 'REORDER_WINDOW_DAYS', 90))
+REORDER_LEAD_TIME_DAYS = float(getattr(settings, 'REORDER_LEAD_TIME_DAYS', 7))
+# Standard normal quantile of the wanted service level (1.65 ~ 95%).
+REORDER_SERVICE_Z = float(getattr(settings, 'REORDER_SERVICE_Z', 1.65))
+# Items used on fewer days than this get no suggestion.
+MIN_USAGE_DAYS = 2
+
+_FIELDS = ['consumption_rate_per_day', 'consumption_stddev_per_day', 'suggested_reorder_threshold', 'reorder_suggested_at']
+
+
+class ReorderNotAvailable(RuntimeError):
+    pass
+
+
+def usage_statistics(item: "np.ndarray", day: "np.ndarray", quantity: "np.ndarray", n_items: int, n_days: int):
+    """Mean and sample standard deviation of daily use per item.
+
+    ``item`` and ``day`` are indexes into an ``n_items`` x ``n_days`` grid;
+    days without removals count as zero use. Returns ``(mean, stddev,
+    usage_days)`` arrays of length ``n_items``.
+    """
+    daily = np.bincount(item * n_days + day, weights=quantity, minlength=n_items * n_days).reshape(n_items, n_days)
+    mean = daily.mean(axis=1)
+    stddev = daily.std(axis=1, ddof=1) if n_days > 1 else np.zeros(n_items)
+    return mean, stddev, np.count_nonzero(daily, axis=1)
+
+
+def suggest_reorder_thresholds(now: datetime | None = None) -> dict:
+    """Compute consumption rates and suggested thresholds for every item.
+
+    Returns a small summary dict.
+    """
+    if not HAVE_NUMPY:
+        raise ReorderNotAvailable("numpy is not installed. Install numpy to enable reorder suggestions.")
+
+    now = now or timezone.now()
+    since = now - timedelta(days=REORDER_WINDOW_DAYS)
+    rows = list(
+        InventoryTransaction.objects.filter(created_at__gte=since, created_at__lt=now, delta__lt=0, item__isnull=False)
+        .values_list('item_id', 'delta', 'created_at')
+    )
+
+    stats: dict[int, tuple[float, float, int | None]] = {}
+    if rows:
+        item_ids = np.fromiter((item_id for item_id, _, _ in rows), dtype=np.int64, count=len(rows))
+        keys, item = np.unique(item_ids, return_inverse=True)
+        day = np.fromiter(
+            ((ts - since).total_seconds() // 86400 for _, _, ts in rows), dtype=np.int64, count=len(rows)
+        )
+        day = np.clip(day, 0, REORDER_WINDOW_DAYS - 1)
+        quantity = np.fromiter((-delta for _, delta, _ in rows), dtype=float, count=len(rows))
+        mean, stddev, usage_days = usage_statistics(item, day, quantity, len(keys), REORDER_WINDOW_DAYS)
+        lead = REORDER_LEAD_TIME_DAYS
+        point = np.ceil(mean * lead + REORDER_SERVICE_Z * stddev * math.sqrt(lead))
+
+        for i, item_id in enumerate(keys.tolist()):
+            suggestion = int(point[i]) if usage_days[i] >= MIN_USAGE_DAYS else None
+            stats[item_id] = (round(float(mean[i]), 4), round(float(stddev[i]), 4), suggestion)
+
+    items = list(InventoryItem.objects.only('id', *_FIELDS))
+    changed = []
+    for inv in items:
+        rate, stddev, suggestion = stats.get(inv.pk, (0.0, 0.0, None))
+        if (inv.consumption_rate_per_day, inv.consumption_stddev_per_day, inv.suggested_reorder_threshold) != (rate, stddev, suggestion):
+            inv.consumption_rate_per_day = rate
+            inv.consumption_stddev_per_day = stddev
+            inv.suggested_reorder_threshold = suggestion
+            changed.append(inv)
+        inv.reorder_suggested_at = now
+    # Only the computed columns are written; stock counts are left alone.
+    InventoryItem.objects.bulk_update(items, _FIELDS, batch_size=500)
+
+    return {
+        'removals': len(rows),
+        'items': len(items),
+        'suggestions': sum(1 for _, _, suggestion in stats.values() if suggestion is not None),
+        'changed': len(changed),
+    }
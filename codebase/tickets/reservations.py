@@ -0,0 +1,162 @@
+"""Stock reservations for SUPPLY tickets.
+
+Placing an order reserves up to the available quantity of each inventory
+item (``quantity_on_hand - quantity_reserved``); the reserved part of each
+line is stored on ``SupplyLine.reserved_quantity``. Fulfilling the ticket
+consumes the reservation (on hand and reserved both drop), closing it
+(or deleting the ticket or one of its lines) releases the reservation, and
+reopening a closed ticket reserves again. Every stock change is a single conditional
+``UPDATE`` with F() expressions, so concurrent orders cannot reserve more
+than is on hand and never overwrite each other's counts. Consumed stock is
+recorded in the InventoryTransaction ledger, one row per ticket and item.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .inventory import adjust_quantity, split_into_transactions
+from .models import InventoryItem, InventoryTransaction, RequestTicket, SupplyLine
+
+# Conditional UPDATEs retried this many times when another order got there first
+_RESERVE_ATTEMPTS = 3
+
+
+def _reserve(item_id: int, quantity: int) -> int:
+    """Reserve up to ``quantity`` units of one item; returns the units reserved."""
+    for _ in range(_RESERVE_ATTEMPTS):
+        row = InventoryItem.objects.filter(pk=item_id).values_list('quantity_on_hand', 'quantity_reserved').first()
+        if row is None:
+            return 0
+        take = min(quantity, max(0, row[0] - row[1]))
+        if take <= 0:
+            return 0
+        updated = InventoryItem.objects.filter(
+            pk=item_id,
+            quantity_on_hand__gte=F('quantity_reserved') + take,
+        ).update(quantity_reserved=F('quantity_reserved') + take)
+        if updated:
+            return take
+    return 0
+
+
+def reserve_supply_lines(lines: Iterable[SupplyLine]) -> None:
+    """Reserve stock for saved SupplyLines (in order; short lines stay unreserved)."""
+    by_item: dict[int, list[SupplyLine]] = {}
+    for line in lines:
+        if line.item_id and line.quantity:
+            by_item.setdefault(line.item_id, []).append(line)
+    if not by_item:
+        return
+
+    touched: list[SupplyLine] = []
+    with transaction.atomic():
+        for item_id, item_lines in by_item.items():
+            remaining = _reserve(item_id, sum(line.quantity for line in item_lines))
+            for line in item_lines:
+                line.reserved_quantity = min(line.quantity, remaining)
+                remaining -= line.reserved_quantity
+                if line.reserved_quantity:
+                    touched.append(line)
+        if touched:
+            SupplyLine.objects.bulk_update(touched, ['reserved_quantity'])
+
+
+def _settle(lines, *, consume: bool, user=None) -> int:
+    """Release (or consume) the reservations held by the SupplyLine queryset ``lines``."""
+    with transaction.atomic():
+        rows = list(
+            lines.select_for_update()
+            .filter(reserved_quantity__gt=0)
+            .values_list('pk', 'item_id', 'reserved_quantity', 'ticket_id', 'ticket__printer__campus_label')
+        )
+        if not rows:
+            return 0
+        # Zero the lines first: a second settle of the same tickets finds nothing.
+        SupplyLine.objects.filter(pk__in=[row[0] for row in rows], reserved_quantity__gt=0).update(reserved_quantity=0)
+        totals: dict[int, int] = {}
+        per_ticket: dict[int, dict[tuple[int, str], int]] = {}
+        for _, item_id, quantity, ticket_id, printer_label in rows:
+            if item_id:
+                totals[item_id] = totals.get(item_id, 0) + quantity
+                parts = per_ticket.setdefault(item_id, {})
+                parts[(ticket_id, printer_label or '')] = parts.get((ticket_id, printer_label or ''), 0) + quantity
+
+        ledger: list[InventoryTransaction] = []
+        for item_id in sorted(totals):
+            quantity = totals[item_id]
+            InventoryItem.objects.filter(pk=item_id).update(
+                quantity_reserved=Greatest(F('quantity_reserved') - quantity, 0)
+            )
+            if not consume:
+                continue
+            result = adjust_quantity(item_id, -quantity)
+            if result is not None:
+                ledger.extend(split_into_transactions(
+                    item_id,
+                    result[0],
+                    [
+                        (-qty, {'ticket_id': ticket_id, 'destination': label[:200]})
+                        for (ticket_id, label), qty in per_ticket[item_id].items()
+                    ],
+                    source=InventoryTransaction.FULFILMENT,
+                    user=user,
+                ))
+        InventoryTransaction.objects.bulk_create(ledger)
+    return sum(totals.values())
+
+
+def consume_reservations(ticket_ids: Iterable[int], *, user=None) -> int:
+    """Take the reserved units out of stock for fulfilled tickets (recorded in the ledger)."""
+    ticket_ids = list(ticket_ids)
+    if not ticket_ids:
+        return 0
+    return _settle(SupplyLine.objects.filter(ticket_id__in=ticket_ids), consume=True, user=user)
+
+
+def release_reservations(ticket_ids: Iterable[int]) -> int:
+    """Return the reserved units of closed tickets to available stock."""
+    ticket_ids = list(ticket_ids)
+    if not ticket_ids:
+        return 0
+    return _settle(SupplyLine.objects.filter(ticket_id__in=ticket_ids), consume=False)
+
+
+def release_lines(line_ids: Iterable[int]) -> int:
+    """Return the reserved units of individual lines (edited or deleted) to available stock."""
+    line_ids = list(line_ids)
+    if not line_ids:
+        return 0
+    return _settle(SupplyLine.objects.filter(pk__in=line_ids), consume=False)
+
+
+def reserve_unreserved(ticket_ids: Iterable[int]) -> None:
+    """Try again to reserve stock for the lines of ``ticket_ids`` that hold none.
+
+    Used when a closed ticket is reopened (its lines were released). Lines
+    that were only partly covered keep what they have.
+    """
+    ticket_ids = list(ticket_ids)
+    if ticket_ids:
+        reserve_supply_lines(
+            SupplyLine.objects.filter(ticket_id__in=ticket_ids, reserved_quantity=0, item__isnull=False).order_by('ticket_id', 'position')
+        )
+
+
+def can_change_status(current: str, new: str) -> bool:
+    """Fulfilled tickets cannot be reopened: their stock has already been consumed."""
+    return not (current == RequestTicket.FULFILLED and new in RequestTicket.PENDING_STATUSES)
+
+
+def settle_for_status(ticket_ids: Iterable[int], status: str, *, user=None) -> int:
+    """Consume, release or re-reserve stock for tickets that just moved to ``status``."""
+    if status == RequestTicket.FULFILLED:
+        return consume_reservations(ticket_ids, user=user)
+    if status == RequestTicket.CLOSED:
+        return release_reservations(ticket_ids)
+    if status in RequestTicket.PENDING_STATUSES:
+        reserve_unreserved(ticket_ids)
+    return 0
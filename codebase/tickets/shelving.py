@@ -104,6 +104,10 @@ def shelf_sort_key(obj: Any) -> tuple[int, int, str]:
 
 
 def sort_by_shelf(items: Iterable[Any]) -> list[Any]:
-    """Return a new list sorted by shelf (row letters, then column number)."""
+    """Return a new list sorted by shelf (row letters, then column number).
+
+    For InventoryItem querysets use ``InventoryItem.objects.in_shelf_order()``
+    instead, which sorts (and paginates) in the database.
+    """
     return sorted(items, key=shelf_sort_key)
 
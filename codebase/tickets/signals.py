@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from .compatibility import invalidate_compatibility
+from .fleet_health import refresh_fleet_health, refresh_fleet_health_for_printers
+from .models import ConsumableCompatibility, InventoryItem, Printer, PrinterGroup, RequestTicket, SupplyLine
+from .permissions import invalidate_manager_permissions
+from .portal_cache import invalidate_portal_cache
+from .reservations import release_lines
+
+
+@receiver([post_save, post_delete], sender=RequestTicket)
+def _ticket_changed(sender, instance, **kwargs):
+    # Open issue counts follow ticket status. Bulk writes (admin status
+    # actions, automatic tickets) refresh the affected printers themselves.
+    printer_id = instance.printer_id
+    transaction.on_commit(lambda: refresh_fleet_health_for_printers([printer_id]))
+
+
+@receiver(pre_delete, sender=SupplyLine)
+def _supply_line_deleted(sender, instance, **kwargs):
+    # Runs for lines removed on their own and for the cascade from a deleted
+    # ticket (or printer), while the row still exists to be settled.
+    if instance.reserved_quantity:
+        release_lines([instance.pk])
+
+
+@receiver(post_init, sender=Printer)
+def _remember_printer_group(sender, instance, **kwargs):
+    # The group the printer was loaded with, so a move refreshes both groups.
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+
+
+@receiver([post_save, post_delete], sender=Printer)
+def _printer_changed(sender, instance, **kwargs):
+    group_ids = {instance.group_id, getattr(instance, '_loaded_group_id', instance.group_id)}
+    instance._loaded_group_id = instance.group_id
+    transaction.on_commit(lambda: refresh_fleet_health(group_ids))
+
+
+@receiver(post_delete, sender=PrinterGroup)
+def _group_deleted(sender, instance, **kwargs):
+    # The group's row is gone with it and its printers are now ungrouped.
+    transaction.on_commit(lambda: refresh_fleet_health([None]))
+
+
+@receiver([post_save, post_delete], sender=Printer)
+@receiver([post_save, post_delete], sender=PrinterGroup)
+def _portal_changed(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_portal_cache)
+
+
+@receiver(m2m_changed, sender=PrinterGroup.managers.through)
+@receiver([post_save, post_delete], sender=Printer)
+@receiver(post_delete, sender=PrinterGroup)
+def _managers_changed(sender, **kwargs):
+    # Manager assignments, or a printer moving between groups, change the
+    # cached managed-id sets; saving a group's name does not.
+    action = kwargs.get('action')
+    if action is None or action.startswith('post_'):
+        transaction.on_commit(invalidate_manager_permissions)
+
+
+@receiver([post_save, post_delete], sender=ConsumableCompatibility)
+@receiver(m2m_changed, sender=InventoryItem.compatible_printers.through)
+@receiver(m2m_changed, sender=InventoryItem.excluded_printers.through)
+@receiver(post_delete, sender=InventoryItem)
+@receiver([post_save, post_delete], sender=Printer)
+def _compatibility_changed(sender, **kwargs):
+    # Rules, overrides and printer make/model all feed the compatibility index.
+    action = kwargs.get('action')
+    if action is None or action.startswith('post_'):
+        transaction.on_commit(invalidate_compatibility)
+
+
+@receiver(post_save, sender=InventoryItem)
+def _inventory_item_saved(sender, instance, update_fields=None, **kwargs):
+    # Cached order-form item lists carry names and model numbers; stock-count
+    # updates (update_fields=['quantity_on_hand']) leave them valid.
+    if update_fields is None or set(update_fields) & {'name', 'model_number', 'category'}:
+        transaction.on_commit(invalidate_compatibility)
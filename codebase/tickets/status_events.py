@@ -0,0 +1,136 @@
+"""In-process pub/sub for PrinterStatus changes.
+
+Polls publish the ids of the printers they refreshed; ``manager_status_stream``
+connections wait on the broker and then read only those statuses. Polls made
+by other processes (``prewarm_status``, other workers) are not seen here, so
+subscribers also wake every ``STATUS_STREAM_CHECK_SECONDS`` and check the
+database for rows updated since their cursor.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import deque
+from typing import Iterable
+
+from django.conf import settings
+
+from .models import PrinterStatus
+
+STREAM_CHECK_SECONDS = max(1, int(getattr(settings, 'STATUS_STREAM_CHECK_SECONDS', 15)))
+# Streams are closed after this long; EventSource reconnects on its own, which
+# keeps long-lived connections from pinning a worker forever.
+STREAM_MAX_SECONDS = max(STREAM_CHECK_SECONDS, int(getattr(settings, 'STATUS_STREAM_MAX_SECONDS', 600)))
+# Open streams per process. Each one holds a server thread, so this must stay
+# well below the server's thread count (waitress --threads) or a few
+# dashboard tabs starve every other page. Over the limit, dashboards poll.
+STREAM_MAX_CONNECTIONS = max(0, int(getattr(settings, 'STATUS_STREAM_MAX_CONNECTIONS', 4)))
+
+# Payload keys that change on every poll even when nothing else did.
+_VOLATILE_STATUS_KEYS = ('fetched_at', 'updated_at', 'display_timestamp')
+
+
+class StatusBroker:
+    """Sequence-numbered change log guarded by a condition variable."""
+
+    def __init__(self, history: int = 512):
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._events: deque[tuple[int, frozenset[int]]] = deque(maxlen=history)
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def publish(self, printer_ids: Iterable[int]) -> int:
+        ids = frozenset(printer_ids)
+        if not ids:
+            return self._seq
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, ids))
+            self._cond.notify_all()
+            return self._seq
+
+    def wait(self, seq: int, timeout: float) -> tuple[int, set[int] | None]:
+        """Block until something newer than ``seq`` is published or ``timeout``.
+
+        Returns ``(new_seq, printer_ids)``. ``printer_ids`` is ``None`` when the
+        subscriber fell behind the history window and must re-check everything.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != seq, timeout=timeout)
+            if self._seq == seq:
+                return seq, set()
+            if not self._events or self._events[0][0] > seq + 1:
+                return self._seq, None
+            changed: set[int] = set()
+            for event_seq, ids in self._events:
+                if event_seq > seq:
+                    changed |= ids
+            return self._seq, changed
+
+
+broker = StatusBroker()
+
+
+class StreamSlots:
+    """Counts open streams against ``STREAM_MAX_CONNECTIONS``."""
+
+    def __init__(self, limit: int):
+        self._sem = threading.BoundedSemaphore(limit) if limit > 0 else None
+
+    def acquire(self) -> bool:
+        return self._sem is not None and self._sem.acquire(blocking=False)
+
+    def release(self) -> None:
+        self._sem.release()
+
+    def hold(self, iterator):
+        """Wrap a response iterator so the slot is freed when the server closes it."""
+        return _HeldStream(iterator, self._sem.release)
+
+
+class _HeldStream:
+    def __init__(self, iterator, release):
+        self._iterator = iterator
+        self._release = release
+
+    def __iter__(self):
+        return iter(self._iterator)
+
+    def close(self):
+        try:
+            close = getattr(self._iterator, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            release, self._release = self._release, None
+            if release is not None:
+                release()
+
+
+stream_slots = StreamSlots(STREAM_MAX_CONNECTIONS)
+
+
+def publish_status_changes(statuses: Iterable[PrinterStatus]) -> None:
+    """Post-poll hook: announce freshly saved statuses to stream subscribers."""
+    broker.publish(s.printer_id for s in statuses if s is not None and s.printer_id)
+
+
+def status_fingerprint(payload: dict) -> str:
+    """Stable hash of a status payload, ignoring poll timestamps."""
+    status = {k: v for k, v in (payload.get('status') or {}).items() if k not in _VOLATILE_STATUS_KEYS}
+    blob = json.dumps(status, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode('utf-8')).hexdigest()
+
+
+def format_event(event: str, data: dict, *, event_id: str | None = None) -> str:
+    """Serialize one Server-Sent Events message."""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .compatibility import compatibility_index
+from .models import InventoryItem, PrinterStatus, SupplyLevelSample, SupplyReading
+
+LOW_SUPPLY_PERCENT = int(getattr(settings, 'SUPPLY_LOW_PERCENT', 10))
+SAMPLE_INTERVAL = timedelta(hours=int(getattr(settings, 'SUPPLY_SAMPLE_INTERVAL_HOURS', 6)))
+# Samples older than the forecast window are never read again (tickets.forecasting).
+SAMPLE_RETENTION = timedelta(days=int(getattr(settings, 'SUPPLY_FORECAST_WINDOW_DAYS', 30)))
+
+# Checked in order; the first keyword found in the description wins, so
+# "Waste Toner Box" is classified as waste rather than toner.
+_KIND_KEYWORDS: list[tuple[str, tuple[str, ...]]] = [
+    (SupplyReading.WASTE, ('waste',)),
+    (SupplyReading.DRUM, ('drum', 'photoconductor', 'imaging unit')),
+    (SupplyReading.FUSER, ('fuser',)),
+    (SupplyReading.MAINTENANCE, ('maintenance', 'transfer', 'kit')),
+    (SupplyReading.STAPLE, ('staple',)),
+    (SupplyReading.TONER, ('toner', 'cartridge', 'ink')),
+]
+
+
+def classify_supply(description: str) -> str:
+    """Map an SNMP supply description to a coarse SupplyReading kind."""
+    text = (description or '').lower()
+    for kind, keywords in _KIND_KEYWORDS:
+        if any(word in text for word in keywords):
+            return kind
+    return SupplyReading.OTHER
+
+
+def _clean_percent(value) -> int | None:
+    if value is None:
+        return None
+    try:
+        pct = int(round(float(value)))
+    except (TypeError, ValueError):
+        return None
+    return max(0, min(100, pct))
+
+
+def _readings_from_supplies(printer_id: int, supplies: Iterable[dict]) -> list[SupplyReading]:
+    readings: dict[str, SupplyReading] = {}
+    for supply in supplies or []:
+        if not isinstance(supply, dict):
+            continue
+        description = (supply.get('description') or '').strip()[:255]
+        if not description or description in readings:
+            continue
+        readings[description] = SupplyReading(
+            printer_id=printer_id,
+            description=description,
+            kind=classify_supply(description),
+            percent=_clean_percent(supply.get('percent')),
+            level=supply.get('level'),
+            max_capacity=supply.get('max_capacity'),
+        )
+    return list(readings.values())
+
+
+def sync_supply_readings(statuses: Iterable[PrinterStatus]) -> None:
+    """Rewrite SupplyReading rows to mirror each status' ``supplies`` JSON.
+
+    Failed polls keep the previous JSON list, so the table keeps the last
+    known levels in that case as well. Successful polls also append a
+    SupplyLevelSample when a level changed or the last sample is stale, and
+    prune samples older than the forecast window.
+    """
+    status_list = [s for s in statuses if s is not None and s.printer_id]
+    if not status_list:
+        return
+
+    now = timezone.now()
+    printer_ids = [s.printer_id for s in status_list]
+    live_printer_ids = {s.printer_id for s in status_list if s.snmp_ok}
+    new_rows: list[SupplyReading] = []
+    for status in status_list:
+        new_rows.extend(_readings_from_supplies(status.printer_id, status.supplies))
+
+    with transaction.atomic():
+        existing = {
+            (printer_id, description): (pk, percent, last_sampled_at, low_since)
+            for pk, printer_id, description, percent, last_sampled_at, low_since in SupplyReading.objects.filter(
+                printer_id__in=printer_ids
+            ).values_list('pk', 'printer_id', 'description', 'percent', 'last_sampled_at', 'low_since')
+        }
+        keep = {(r.printer_id, r.description) for r in new_rows}
+        stale_ids = [pk for key, (pk, _, _, _) in existing.items() if key not in keep]
+        if stale_ids:
+            SupplyReading.objects.filter(pk__in=stale_ids).delete()
+
+        samples: list[SupplyLevelSample] = []
+        for row in new_rows:
+            _, prev_percent, prev_sampled, prev_low_since = existing.get(
+                (row.printer_id, row.description), (None, None, None, None)
+            )
+            row.last_sampled_at = prev_sampled
+            if row.percent is not None and row.percent <= LOW_SUPPLY_PERCENT:
+                row.low_since = prev_low_since or now
+            if row.percent is None or row.printer_id not in live_printer_ids:
+                continue
+            if prev_sampled is None or prev_percent != row.percent or now - prev_sampled >= SAMPLE_INTERVAL:
+                row.last_sampled_at = now
+                samples.append(SupplyLevelSample(
+                    printer_id=row.printer_id,
+                    description=row.description,
+                    percent=row.percent,
+                    recorded_at=now,
+                ))
+
+        if new_rows:
+            SupplyReading.objects.bulk_create(
+                new_rows,
+                update_conflicts=True,
+                unique_fields=['printer', 'description'],
+                update_fields=['kind', 'percent', 'level', 'max_capacity', 'updated_at', 'last_sampled_at', 'low_since'],
+            )
+        if samples:
+            SupplyLevelSample.objects.bulk_create(samples)
+            SupplyLevelSample.objects.filter(recorded_at__lt=now - SAMPLE_RETENTION).delete()
+
+
+def supply_forecast_map(printer_ids: Iterable[int]) -> dict[int, dict[str, dict]]:
+    """Map printer id -> supply description -> forecast fields for payloads."""
+    forecasts: dict[int, dict[str, dict]] = {}
+    rows = SupplyReading.objects.filter(
+        printer_id__in=list(printer_ids),
+        predicted_empty_at__isnull=False,
+    ).values_list('printer_id', 'description', 'depletion_rate_per_day', 'predicted_empty_at')
+    for printer_id, description, rate, empty_at in rows:
+        forecasts.setdefault(printer_id, {})[description] = {
+            'depletion_rate_per_day': round(rate, 3) if rate is not None else None,
+            'predicted_empty_at': empty_at.isoformat(),
+        }
+    return forecasts
+
+
+def low_supply_readings(threshold: int | None = None, *, kind: str | None = None) -> QuerySet[SupplyReading]:
+    """Readings at or below ``threshold`` percent (default ``SUPPLY_LOW_PERCENT``)."""
+    limit = LOW_SUPPLY_PERCENT if threshold is None else threshold
+    qs = SupplyReading.objects.filter(percent__isnull=False, percent__lte=limit)
+    if kind:
+        qs = qs.filter(kind=kind)
+    return qs.select_related('printer').order_by('percent', 'printer__campus_label')
+
+
+# SupplyReading kind -> InventoryItem category that restocks it
+STOCK_CATEGORY_BY_KIND = {
+    SupplyReading.TONER: 'toner',
+    SupplyReading.STAPLE: 'staple',
+    SupplyReading.WASTE: 'waste_basket',
+}
+
+_SUPPLY_COLORS = ('black', 'cyan', 'magenta', 'yellow')
+
+
+def compatible_items_by_printer(printer_ids: Iterable[int]) -> dict[int, list[InventoryItem]]:
+    """Compatible InventoryItems for each printer (cached index plus one query)."""
+    index = compatibility_index()
+    item_ids_by_printer = {
+        printer_id: sorted(index[printer_id]) for printer_id in printer_ids if printer_id in index
+    }
+    items = InventoryItem.objects.in_bulk({i for ids in item_ids_by_printer.values() for i in ids})
+    return {
+        printer_id: [items[i] for i in ids if i in items]
+        for printer_id, ids in item_ids_by_printer.items()
+    }
+
+
+def match_stock_items(reading: SupplyReading, candidates: Iterable[InventoryItem]) -> list[InventoryItem]:
+    """Narrow compatible items to the ones that restock ``reading``.
+
+    Filters by category for the reading's kind and, when the description names
+    a toner color, prefers items mentioning the same color.
+    """
+    category = STOCK_CATEGORY_BY_KIND.get(reading.kind)
+    if not category:
+        return []
+    items = [item for item in candidates if item.category == category]
+    description = reading.description.lower()
+    for color in _SUPPLY_COLORS:
+        if color in description:
+            same_color = [
+                item for item in items
+                if color in f"{item.name} {item.model_number}".lower()
+            ]
+            if same_color:
+                return same_color
+            break
+    return items
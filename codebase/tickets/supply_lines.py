@@ -0,0 +1,64 @@
+"""Structured line items for SUPPLY tickets.
+
+Order views turn their item formsets into unsaved SupplyLine rows with
+``build_supply_lines``, render the same "Item N: ..." text the ticket details
+have always carried (``describe_supply_lines``), and write the rows with one
+``bulk_create`` after the ticket is saved, reserving stock for them
+(``tickets.reservations``).
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from .forms import OTHER_SENTINEL
+from .models import RequestTicket, SupplyLine
+from .reservations import reserve_supply_lines
+
+
+def _item_label(item) -> str:
+    label = f"{item.name} ({item.category})"
+    if item.model_number:
+        label += f" [{item.model_number}]"
+    return label
+
+
+def build_supply_lines(cleaned_items: Iterable[dict], item_choices=None) -> list[SupplyLine]:
+    """Unsaved SupplyLines for the non-empty rows of an item formset.
+
+    Rows of ``InventorySupplyItemFormSet`` are resolved through
+    ``item_choices``; rows of ``SupplyItemFormSet`` (paper) only carry a
+    ``supply_type`` text.
+    """
+    lines: list[SupplyLine] = []
+    for position, row in enumerate([row for row in cleaned_items if row], start=1):
+        quantity = row.get('supply_quantity') or 1
+        if 'supply_type' in row:
+            lines.append(SupplyLine(description=row['supply_type'], quantity=quantity, position=position))
+            continue
+        selected = row.get('supply_item')
+        if selected == OTHER_SENTINEL:
+            other_text = (row.get('supply_other') or '').strip() or 'unspecified'
+            lines.append(SupplyLine(
+                description=f"Other / Not listed — {other_text}"[:255],
+                quantity=quantity,
+                position=position,
+            ))
+            continue
+        item = item_choices.get(selected) if item_choices is not None else None
+        if item is not None:
+            lines.append(SupplyLine(item=item, description=_item_label(item)[:255], quantity=quantity, position=position))
+    return lines
+
+
+def describe_supply_lines(lines: Iterable[SupplyLine]) -> list[str]:
+    return [f"Item {line.position}: {line.description} (qty {line.quantity})" for line in lines]
+
+
+def save_supply_lines(ticket: RequestTicket, lines: list[SupplyLine]) -> list[SupplyLine]:
+    """Write the lines for a newly placed ticket and reserve their stock."""
+    for line in lines:
+        line.ticket = ticket
+    created = SupplyLine.objects.bulk_create(lines)
+    reserve_supply_lines(created)
+    return created
+
@@ -1,3 +1,183 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import IntegrityError
 from django.test import TestCase
+from django.utils import timezone
+
+from . import inventory, printer_status
+from .models import (
+    InventoryItem,
+    InventoryScanReceipt,
+    InventoryTransaction,
+    PollLease,
+    Printer,
+    PrinterStatus,
+)
+from .poll_leases import claim_printers, leased_printers, release_leases
+
+
+def make_printer(n: int = 0) -> Printer:
+    return Printer.objects.create(
+        campus_label=f'P{n}',
+        asset_tag=f'A{n}',
+        make='HP',
+        model='M1',
+        building='B',
+        location_in_building='L',
+        mac_address=f'00:11:22:33:44:{n:02d}',
+    )
+
+
+class PollLeaseTests(TestCase):
+    def setUp(self):
+        self.printer = make_printer()
+
+    def test_claim_excludes_other_pollers_until_release(self):
+        claimed, token = claim_printers([self.printer.id])
+        self.assertEqual(claimed, {self.printer.id})
+        self.assertEqual(claim_printers([self.printer.id])[0], set())
+        self.assertEqual(leased_printers([self.printer.id]), {self.printer.id})
+
+        release_leases(claimed, token)
+        self.assertEqual(leased_printers([self.printer.id]), set())
+        self.assertEqual(claim_printers([self.printer.id])[0], {self.printer.id})
+
+    def test_expired_lease_can_be_claimed(self):
+        PollLease.objects.create(
+            printer=self.printer, owner='other', expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        claimed, token = claim_printers([self.printer.id])
+        self.assertEqual(claimed, {self.printer.id})
+        self.assertEqual(PollLease.objects.get(printer=self.printer).owner, token)
+
+    def test_release_leaves_leases_taken_over_by_others(self):
+        claimed, token = claim_printers([self.printer.id])
+        PollLease.objects.filter(printer=self.printer).update(expires_at=timezone.now() - timedelta(seconds=1))
+        other, other_token = claim_printers([self.printer.id])
+        self.assertEqual(other, {self.printer.id})
+
+        release_leases(claimed, token)
+        self.assertEqual(PollLease.objects.get(printer=self.printer).owner, other_token)
+
+
+@mock.patch.object(printer_status, 'after_poll_batch')
+@mock.patch.object(printer_status, '_poll_into')
+class LeasedPollTests(TestCase):
+    def setUp(self):
+        self.printer = make_printer()
+        PrinterStatus.objects.create(printer=self.printer)
+
+    def test_worker_skips_printer_leased_after_it_was_queued(self, poll_into, after_poll_batch):
+        # The queued poll waited past the lease time; another poller has the printer now.
+        claim_printers([self.printer.id])
+        with mock.patch.object(printer_status, 'connection'):
+            status = printer_status._poll_in_worker(self.printer)
+        self.assertEqual(status.printer_id, self.printer.id)
+        poll_into.assert_not_called()
+        after_poll_batch.assert_not_called()
+
+    def test_worker_polls_and_releases_free_printer(self, poll_into, after_poll_batch):
+        with mock.patch.object(printer_status, 'connection'):
+            printer_status._poll_in_worker(self.printer)
+        poll_into.assert_called_once()
+        self.assertEqual(leased_printers([self.printer.id]), set())
+
+    def test_refresh_statuses_skips_leased_printer(self, poll_into, after_poll_batch):
+        claim_printers([self.printer.id])
+        printer_status.refresh_statuses([self.printer], force=True)
+        poll_into.assert_not_called()
+
+    def test_concurrent_refresh_reports_leased_printer_as_pending(self, poll_into, after_poll_batch):
+        claim_printers([self.printer.id])
+        with mock.patch.object(printer_status, '_submit_poll') as submit:
+            _, pending = printer_status.refresh_statuses_concurrently([self.printer], force=True)
+        submit.assert_not_called()
+        self.assertEqual(pending, {self.printer.id})
+
+
+def scan(key: str, mode: str = 'out', barcode: str = 'B-1', destination: str = '') -> dict:
+    return {'key': key, 'barcode': barcode, 'mode': mode, 'destination': destination}
+
+
+class AdjustQuantityTests(TestCase):
+    def setUp(self):
+        self.item = InventoryItem.objects.create(name='Toner', barcode='B-1', quantity_on_hand=2)
+
+    def test_decrement_past_zero_clamps_and_ledger_matches(self):
+        result = inventory.record_adjustment(self.item.pk, -5, source=InventoryTransaction.SCAN)
+        self.assertEqual(result, (2, 0))
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity_on_hand, 0)
+        row = InventoryTransaction.objects.get(item=self.item)
+        self.assertEqual((row.delta, row.quantity_before, row.quantity_after), (-2, 2, 0))
+
+    def test_decrement_at_zero_writes_no_ledger_row(self):
+        InventoryItem.objects.filter(pk=self.item.pk).update(quantity_on_hand=0)
+        self.assertEqual(inventory.record_adjustment(self.item.pk, -1, source=InventoryTransaction.SCAN), (0, 0))
+        self.assertFalse(InventoryTransaction.objects.exists())
+
+    def test_missing_item_returns_none(self):
+        self.assertIsNone(inventory.adjust_quantity(self.item.pk + 1000, -1))
+
+
+class ScanBatchTests(TestCase):
+    def setUp(self):
+        self.item = InventoryItem.objects.create(name='Toner', barcode='B-1', quantity_on_hand=5)
+
+    def quantity(self) -> int:
+        self.item.refresh_from_db()
+        return self.item.quantity_on_hand
+
+    def test_resent_batch_applies_once(self):
+        batch = [scan('k1'), scan('k2')]
+        results, changes = inventory.apply_scan_batch(batch)
+        self.assertEqual([r['status'] for r in results], ['applied', 'applied'])
+        self.assertEqual(changes[self.item.pk]['after'], 3)
+
+        results, changes = inventory.apply_scan_batch(batch)
+        self.assertEqual([r['status'] for r in results], ['duplicate', 'duplicate'])
+        self.assertEqual(changes, {})
+        self.assertEqual(self.quantity(), 3)
+        self.assertEqual(InventoryTransaction.objects.filter(item=self.item).count(), 1)
+
+    def test_repeated_key_in_one_batch_applies_once(self):
+        results, _ = inventory.apply_scan_batch([scan('k1'), scan('k1')])
+        self.assertEqual([r['status'] for r in results], ['applied', 'duplicate'])
+        self.assertEqual(self.quantity(), 4)
+
+    def test_batch_over_stock_clamps_and_ledger_matches(self):
+        results, changes = inventory.apply_scan_batch(
+            [scan(f'k{i}', destination='Room 1') for i in range(7)] + [scan('in', mode='in')]
+        )
+        self.assertEqual(changes[self.item.pk], {'before': 5, 'after': 0, 'requested': -6, 'applied': -5})
+        self.assertEqual(self.quantity(), 0)
+        rows = list(InventoryTransaction.objects.filter(item=self.item).order_by('pk'))
+        self.assertEqual(sum(row.delta for row in rows), -5)
+        self.assertEqual(rows[-1].quantity_after, 0)
+
+    def test_receipt_stored_concurrently_is_reported_duplicate(self):
+        real_apply = inventory._apply_batch
+        calls = []
+
+        def racing_apply(scans, user):
+            calls.append(1)
+            if len(calls) == 1:
+                # Another request stores the same key (and applies it) first.
+                InventoryScanReceipt.objects.create(key='k1', item=self.item, delta=-1)
+                raise IntegrityError('duplicate key')
+            return real_apply(scans, user)
+
+        with mock.patch.object(inventory, '_apply_batch', side_effect=racing_apply):
+            results, changes = inventory.apply_scan_batch([scan('k1')])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual([r['status'] for r in results], ['duplicate'])
+        self.assertEqual(changes, {})
+        self.assertEqual(self.quantity(), 5)
 
-# Create your tests here.
+    def test_unknown_and_deleted_items_are_not_found(self):
+        with mock.patch.object(inventory, 'adjust_quantity', return_value=None):
+            results, changes = inventory.apply_scan_batch([scan('k1'), scan('k2', barcode='nope')])
+        self.assertEqual([r['status'] for r in results], ['not-found', 'not-found'])
+        self.assertEqual(changes, {})
+        self.assertFalse(InventoryScanReceipt.objects.exists())
@@ -1,4 +1,7 @@
-﻿from datetime import timedelta
+﻿import hashlib
+import json
+import time
+from datetime import datetime, timedelta
 
 from django.contrib import messages
 
@@ -10,32 +13,61 @@ from django.shortcuts import get_object_or_404, redirect, render
 
 from django.urls import reverse, reverse_lazy
 
-from django.core.mail import send_mail
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 
 from django.conf import settings
 from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import ensure_csrf_cookie
 
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import parse_etags, quote_etag
 
+from django.db import transaction
+from django.db.models import F, Q
 
 
-from .models import Printer, PrinterGroup, RequestTicket, InventoryItem
+
+from .models import Printer, PrinterGroup, PrinterStatus, RequestTicket, InventoryItem, InventoryTransaction, SupplyReading
 
 from .forms import (
     SupplyRequestForm,
     IssueReportForm,
     SupplyItemFormSet,
+    InventoryItemChoices,
     InventorySupplyItemFormSet,
-    OTHER_SENTINEL,
 )
 from .printer_status import (
+    FEED_BUDGET_SECONDS,
     POLL_INTERVAL_SECONDS,
     ensure_latest_status,
+    refresh_statuses_concurrently,
     build_status_payload,
     attach_status_to_printers,
 )
+from .supplies import (
+    LOW_SUPPLY_PERCENT,
+    compatible_items_by_printer,
+    match_stock_items,
+    supply_forecast_map,
+)
+from .availability import availability_report, default_window
+from .compatibility import allowed_items as allowed_compatible_items
+from .fleet_health import fleet_health
+from .inventory import SCAN_BATCH_LIMIT, apply_scan_batch, record_adjustment
+from .outbox import queue_ticket_email
+from .permissions import can_manage_group, can_manage_printer
+from .portal_cache import get_cached_portal_page, portal_context, set_cached_portal_page
+from .rate_limits import allow_issue_report
+from .status_events import (
+    STREAM_CHECK_SECONDS,
+    STREAM_MAX_SECONDS,
+    broker,
+    format_event,
+    status_fingerprint,
+    stream_slots,
+)
+from .supply_lines import build_supply_lines, describe_supply_lines, save_supply_lines
 
 
 
@@ -59,88 +91,27 @@ def _combine_details(base: str, extra_lines: list[str]) -> str:
 
 
 
-def _send_ticket_email(ticket: RequestTicket, printer: Printer, scope_label: str) -> None:
-
-    body_lines = [
-
-        f"Printer: {printer.campus_label} | {printer.asset_tag}",
-
-        f"Location: {printer.building} / {printer.location_in_building}",
-
-        f"Make/Model: {printer.make} {printer.model}",
-
-        f"IP/MAC: {printer.ip_address} / {printer.mac_address}",
-
-        "",
-
-        f"Scope: {scope_label}",
-
-        f"Requester: {ticket.requester_name} <{ticket.requester_email}>",
-
-        "",
-
-        "Details:",
-
-        ticket.details or "(none)",
-
-    ]
-
-    if ticket.applies_to_group and ticket.group:
-
-        body_lines.append("")
-
-        body_lines.append("Group members:")
-
-        for member in ticket.group.printers.order_by('campus_label'):
-
-            body_lines.append(
-
-                f"  - {member.campus_label} | {member.asset_tag} | {member.location_in_building}"
-
-            )
-
-
-
-    subject = f"[{ticket.type}] {printer.campus_label} ({printer.asset_tag})"
-
-    body = "\n".join(body_lines)
-
-    send_mail(subject, body, settings.DEFAULT_FROM_EMAIL, settings.EMAIL_TO or ["sklarz@berea.edu"])
-
-
-
-
-
-ISSUE_RATE_LIMIT_MAX = 3
-
-ISSUE_RATE_LIMIT_WINDOW = timedelta(hours=1)
+def _queue_ticket_email(ticket: RequestTicket, printer: Printer, scope_label: str) -> None:
+    """Queue the Printing Services notification for a ticket in the email outbox.
 
+    Call inside the transaction that saves the ticket so both commit together;
+    delivery happens after commit (see tickets.outbox).
+    """
+    queue_ticket_email(ticket, printer, scope_label)
 
-def _issue_rate_limit_reached(printer: Printer) -> bool:
-
-    window_start = timezone.now() - ISSUE_RATE_LIMIT_WINDOW
 
-    recent_count = RequestTicket.objects.filter(
 
-        printer=printer,
-
-        type=RequestTicket.ISSUE,
 
-        created_at__gte=window_start,
 
-    ).count()
+def _issue_rate_limit_reached(request, printer: Printer, email: str | None = None) -> bool:
 
-    return recent_count >= ISSUE_RATE_LIMIT_MAX
+    return not allow_issue_report(request, printer, email)
 
 
 
 def _user_can_manage_printer(user, printer: Printer) -> bool:
 
-    if not printer.group:
-
-        return False
-
-    return printer.group.managers.filter(pk=user.pk).exists()
+    return can_manage_printer(user, printer)
 
 
 
@@ -158,7 +129,7 @@ def _get_managed_group(user, group_id: int) -> PrinterGroup:
 
     group = get_object_or_404(PrinterGroup.objects.prefetch_related('printers'), pk=group_id)
 
-    if not group.managers.filter(pk=user.pk).exists():
+    if not can_manage_group(user, group.pk):
 
         raise PermissionDenied("You are not assigned to this printer group.")
 
@@ -186,29 +157,28 @@ def printer_portal(request, qr_token):
     - Ordering flows require staff auth; the template adjusts the actions.
     """
 
-    printer = get_object_or_404(Printer, qr_token=qr_token)
-
-    group_printers = None
-
-    if printer.group:
-
-        group_printers = list(printer.group.printers.order_by('campus_label'))
-
+    # Anonymous scans all see the same page; serve it from cache.
+    anonymous = not request.user.is_authenticated
+    if anonymous:
+        cached = get_cached_portal_page(qr_token)
+        if cached is not None:
+            return HttpResponse(cached)
 
+    context = portal_context(qr_token)
 
     can_order = request.user.is_authenticated and request.user.is_staff
 
-
-
-    return render(
+    response = render(
         request,
         'tickets/portal.html',
         {
-            'printer': printer,
-            'group_printers': group_printers,
+            **context,
             'can_order': can_order,
         },
     )
+    if anonymous:
+        set_cached_portal_page(qr_token, response.content)
+    return response
 
 
 @login_required
@@ -238,12 +208,26 @@ def manager_status_feed(request):
     Optional GET params:
     - printer: restrict to a single printer id (permission checked)
     - force/refresh: bypass cache and poll SNMP now
+    - since: cursor from a previous response; only printers whose status
+      changed after it are returned
+
+    Responses carry a strong ETag derived from the status versions, so an
+    ``If-None-Match`` revalidation of an unchanged feed is answered with 304
+    before any payload is built.
+
+    Group refreshes run concurrently and the feed answers after
+    STATUS_FEED_BUDGET_SECONDS at most. Printers still being polled are listed
+    in ``pending`` (and flagged in their payload); their new status shows up in
+    a later ``since`` request once the poll finishes.
     """
 
     force = _query_flag(request, 'force') or _query_flag(request, 'refresh')
     printer_id = request.GET.get('printer')
-
-    payloads: list[dict] = []
+    since_raw = (request.GET.get('since') or '').strip()
+    since = parse_datetime(since_raw) if since_raw else None
+    if since_raw and since is None:
+        return JsonResponse({'error': 'invalid-since', 'since': since_raw}, status=400)
+    started = timezone.now()
 
     if printer_id:
 
@@ -253,22 +237,163 @@ def manager_status_feed(request):
 
             raise PermissionDenied('You are not assigned to this printer.')
 
-        status = ensure_latest_status(printer, force=force)
-        payloads.append(build_status_payload(printer, status))
+        printers = [printer]
+        statuses = [ensure_latest_status(printer, force=force)]
+        pending: set[int] = set()
 
     else:
 
         groups = list(_managed_groups_queryset(request.user))
+        printers = [printer for group in groups for printer in group.printers.all()]
+        statuses, pending = refresh_statuses_concurrently(
+            printers, force=force, budget_seconds=FEED_BUDGET_SECONDS,
+        )
+
+    versions = [(printer.id, status.updated_at) for printer, status in zip(printers, statuses)]
+    cursor = max((updated for _, updated in versions if updated), default=since)
+    if pending and cursor and cursor > started:
+        # Pending polls save after this request started; keep the cursor
+        # behind them so the next delta request picks them up.
+        cursor = started
+    etag = _status_feed_etag(versions, since, pending)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        resp = HttpResponseNotModified()
+        resp['ETag'] = etag
+        resp['Cache-Control'] = 'private, no-cache'
+        return resp
+
+    changed = [
+        (printer, status) for printer, status in zip(printers, statuses)
+        if since is None or printer.id in pending or (status.updated_at and status.updated_at > since)
+    ]
+    forecasts = supply_forecast_map(printer.id for printer, _ in changed)
+    payloads = []
+    for printer, status in changed:
+        payload = build_status_payload(printer, status, forecasts=forecasts)
+        payload['pending'] = printer.id in pending
+        payloads.append(payload)
+
+    resp = JsonResponse({
+        'printers': payloads,
+        'pending': sorted(pending),
+        'cursor': cursor.isoformat() if cursor else None,
+        'poll_interval_seconds': POLL_INTERVAL_SECONDS,
+    })
+    resp['ETag'] = etag
+    # Browsers may keep the body but must revalidate with If-None-Match.
+    resp['Cache-Control'] = 'private, no-cache'
+    return resp
+
+
+def _status_feed_etag(versions: list[tuple[int, object]], since, pending: set[int]) -> str:
+    """Strong ETag over (printer id, status updated_at) pairs, the cursor and pending ids.
+
+    Forecast fields are refreshed with the next poll, so they do not need to
+    be part of the tag.
+    """
+    digest = hashlib.sha1()
+    digest.update((since.isoformat() if since else '').encode())
+    digest.update(",".join(str(pk) for pk in sorted(pending)).encode())
+    for printer_id, updated in versions:
+        digest.update(f"|{printer_id}:{updated.isoformat() if updated else ''}".encode())
+    return quote_etag(digest.hexdigest())
+
+
+def _status_stream(printers: list[Printer], cursor, sent: dict[int, str]):
+    """Yield SSE messages for managed printers whose status content changed.
+
+    Stale statuses are re-polled every POLL_INTERVAL_SECONDS (that used to be
+    driven by each dashboard tab polling the JSON feed). Between polls the
+    stream sleeps on the in-process broker, falling back to a database check
+    every STREAM_CHECK_SECONDS for polls made by other processes.
+    """
+    printer_map = {printer.id: printer for printer in printers}
+    started = time.monotonic()
+    last_refresh = None
+    seq = broker.seq
+    yield f"retry: {STREAM_CHECK_SECONDS * 1000}\n\n"
+
+    while time.monotonic() - started < STREAM_MAX_SECONDS:
+        if POLL_INTERVAL_SECONDS > 0 and (
+            last_refresh is None or time.monotonic() - last_refresh >= POLL_INTERVAL_SECONDS
+        ):
+            # Don't wait: finished polls are announced through the broker.
+            refresh_statuses_concurrently(printers, budget_seconds=0)
+            last_refresh = time.monotonic()
+
+        seq, changed = broker.wait(seq, STREAM_CHECK_SECONDS)
+        if changed:
+            changed &= printer_map.keys()
+            if not changed:
+                continue
+        # Timed out (changed == set()) or fell behind (None): check every printer
+        candidate_ids = changed or list(printer_map)
+
+        statuses = list(
+            PrinterStatus.objects.filter(printer_id__in=candidate_ids, updated_at__gt=cursor).order_by('updated_at')
+        )
+        forecasts = supply_forecast_map(s.printer_id for s in statuses)
+        messages_out = []
+        for status in statuses:
+            cursor = max(cursor, status.updated_at)
+            payload = build_status_payload(printer_map[status.printer_id], status, forecasts=forecasts)
+            fingerprint = status_fingerprint(payload)
+            if sent.get(status.printer_id) == fingerprint:
+                continue
+            sent[status.printer_id] = fingerprint
+            messages_out.append(format_event('status', payload, event_id=cursor.isoformat()))
+
+        if messages_out:
+            yield from messages_out
+        elif not changed:
+            yield format_event('ping', {'checked_at': timezone.now().isoformat()}, event_id=cursor.isoformat())
 
-        for group in groups:
 
-            for printer in group.printers.all():
+@login_required
+@require_GET
+def manager_status_stream(request):
+    """Server-Sent Events stream of status changes for the manager's printers.
 
-                status = ensure_latest_status(printer, force=force)
-                payloads.append(build_status_payload(printer, status))
+    Each ``status`` event carries one payload in the manager_status_feed
+    shape; only printers whose status changed are sent. Reconnecting clients
+    resume from ``Last-Event-ID`` (or ``?since=``, an ISO timestamp).
 
-    resp = JsonResponse({'printers': payloads, 'poll_interval_seconds': POLL_INTERVAL_SECONDS})
+    When STREAM_MAX_CONNECTIONS streams are already open in this process the
+    answer is ``204 No Content``, which stops EventSource from reconnecting;
+    the dashboard then falls back to polling manager_status_feed.
+    """
+    if not stream_slots.acquire():
+        return HttpResponse(status=204)
+    try:
+        return _open_status_stream(request)
+    except BaseException:
+        stream_slots.release()
+        raise
+
+
+def _open_status_stream(request):
+    printers = [printer for group in _managed_groups_queryset(request.user) for printer in group.printers.all()]
+
+    resume = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    cursor = parse_datetime(resume) if resume else None
+    sent: dict[int, str] = {}
+    if cursor is None:
+        # Fresh connection: the page was just rendered from the cached
+        # statuses, so only push what changes from here on.
+        cursor = timezone.now()
+        statuses = PrinterStatus.objects.filter(printer__in=printers)
+        forecasts = supply_forecast_map(printer.id for printer in printers)
+        printer_map = {printer.id: printer for printer in printers}
+        for status in statuses:
+            payload = build_status_payload(printer_map[status.printer_id], status, forecasts=forecasts)
+            sent[status.printer_id] = status_fingerprint(payload)
+
+    resp = StreamingHttpResponse(
+        stream_slots.hold(_status_stream(printers, cursor, sent)),
+        content_type='text/event-stream',
+    )
     resp['Cache-Control'] = 'no-store'
+    resp['X-Accel-Buffering'] = 'no'
     return resp
 
 
@@ -289,6 +414,17 @@ def inventory_scanner(request):
     })
 
 
+def _scan_item_payload(item: InventoryItem) -> dict:
+    return {
+        'id': item.id,
+        'name': item.name,
+        'model_number': item.model_number,
+        'category': item.category,
+        'shelf_code': item.shelf_code,
+        'barcode': item.barcode,
+    }
+
+
 @login_required(login_url=reverse_lazy('admin:login'))
 @require_POST
 def inventory_scan(request):
@@ -305,43 +441,26 @@ def inventory_scan(request):
     except InventoryItem.DoesNotExist:
         return JsonResponse({'ok': False, 'error': 'not-found', 'barcode': barcode}, status=404)
 
-    before = item.quantity_on_hand
     delta = 1 if mode == 'in' else -1
-    if mode == 'out' and item.quantity_on_hand == 0:
-        after = 0
-        note = 'quantity-already-zero'
-    else:
-        item.quantity_on_hand = max(0, item.quantity_on_hand + delta)
-        item.save(update_fields=['quantity_on_hand'])
-        after = item.quantity_on_hand
-        note = 'ok'
-
-    # Best-effort append to a scan log for audit purposes
-    try:
-        user = getattr(request, 'user', None)
-        user_repr = user.get_username() if getattr(user, 'is_authenticated', False) else 'anon'
-        log_path = settings.BASE_DIR / 'data' / 'inventory_scans.log'
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(log_path, 'a', encoding='utf-8') as fh:
-            fh.write(
-                f"{timezone.now().isoformat()} mode={mode} user={user_repr} "
-                f"item_id={item.id} barcode={barcode} before={before} after={after} "
-                f"destination={destination!r}\n"
-            )
-    except Exception:
-        pass
+    # One conditional UPDATE plus its ledger row; concurrent scans of the
+    # same item both count.
+    result = record_adjustment(
+        item.pk,
+        delta,
+        source=InventoryTransaction.SCAN,
+        user=request.user,
+        destination=destination[:200] if mode == 'out' else '',
+    )
+    if result is None:
+        return JsonResponse({'ok': False, 'error': 'not-found', 'barcode': barcode}, status=404)
+    before, after = result
+    item.quantity_on_hand = after
+    note = 'ok' if after != before else 'quantity-already-zero'
 
     return JsonResponse({
         'ok': True,
         'mode': mode,
-        'item': {
-            'id': item.id,
-            'name': item.name,
-            'model_number': item.model_number,
-            'category': item.category,
-            'shelf_code': item.shelf_code,
-            'barcode': item.barcode,
-        },
+        'item': _scan_item_payload(item),
         'before': before,
         'after': after,
         'delta': delta if note == 'ok' else 0,
@@ -349,6 +468,49 @@ def inventory_scan(request):
         'destination': destination if mode == 'out' else '',
     })
 
+
+@login_required(login_url=reverse_lazy('admin:login'))
+@require_POST
+def inventory_scan_batch(request):
+    """Apply a JSON batch of queued scans (staff only).
+
+    Body: ``{"scans": [{"key": ..., "barcode": ..., "mode": "in"|"out",
+    "destination": ...}, ...]}``. Keys are client-generated; resent scans
+    with a known key are reported as ``duplicate`` and not applied again.
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied('Scanner is restricted to staff users.')
+    try:
+        payload = json.loads(request.body or b'{}')
+    except (TypeError, ValueError):
+        return JsonResponse({'ok': False, 'error': 'invalid-json'}, status=400)
+    scans = payload.get('scans') if isinstance(payload, dict) else None
+    if not isinstance(scans, list):
+        return JsonResponse({'ok': False, 'error': 'missing-scans'}, status=400)
+    if len(scans) > SCAN_BATCH_LIMIT:
+        return JsonResponse({'ok': False, 'error': 'too-many-scans', 'limit': SCAN_BATCH_LIMIT}, status=400)
+
+    results, changes = apply_scan_batch(scans, user=request.user)
+
+    items = {}
+    for result in results:
+        item = result.get('item')
+        if item is not None and item.pk not in items:
+            items[item.pk] = {**_scan_item_payload(item), 'after': item.quantity_on_hand, **changes.get(item.pk, {})}
+    return JsonResponse({
+        'ok': True,
+        'results': [
+            {
+                'key': result['key'],
+                'status': result['status'],
+                'item_id': result['item'].pk if result.get('item') is not None else None,
+            }
+            for result in results
+        ],
+        'items': list(items.values()),
+    })
+
+
 @login_required(login_url=reverse_lazy('admin:login'))
 
 def printer_order(request, qr_token):
@@ -362,12 +524,11 @@ def printer_order(request, qr_token):
 
 
     # Build allowed inventory list for this printer
-    allowed_items = InventoryItem.objects.filter(compatible_printers=printer).order_by('name').distinct()
-    allowed_map = {str(x.id): x for x in allowed_items}
+    item_choices = InventoryItemChoices(allowed_compatible_items([printer.pk]))
 
     if request.method == 'POST':
 
-        items_formset = InventorySupplyItemFormSet(request.POST, prefix='items', allowed_items_qs=allowed_items)
+        items_formset = InventorySupplyItemFormSet(request.POST, prefix='items', item_choices=item_choices)
 
         form = SupplyRequestForm(request.POST, printer=printer)
 
@@ -389,23 +550,8 @@ def printer_order(request, qr_token):
 
 
 
-            extra = []
-
-            for idx, item in enumerate([item for item in items_formset.cleaned_data if item], start=1):
-                if not item:
-                    continue
-                selected = item.get('supply_item')
-                qty = item.get('supply_quantity')
-                if selected == OTHER_SENTINEL:
-                    other_text = (item.get('supply_other') or '').strip() or 'unspecified'
-                    extra.append(f"Item {idx}: Other / Not listed â€” {other_text} (qty {qty})")
-                else:
-                    inv = allowed_map.get(str(selected))
-                    if inv:
-                        label = f"{inv.name} ({inv.category})"
-                        if inv.model_number:
-                            label += f" [{inv.model_number}]"
-                        extra.append(f"Item {idx}: {label} (qty {qty})")
+            supply_lines = build_supply_lines(items_formset.cleaned_data, item_choices)
+            extra = describe_supply_lines(supply_lines)
 
             # Include drop-off location
             drop = (form.cleaned_data.get('drop_off_location') or '').strip()
@@ -420,13 +566,15 @@ def printer_order(request, qr_token):
 
             ticket.details = _combine_details(form.cleaned_data.get('details'), extra)
 
-            ticket.save()
+            with transaction.atomic():
+                ticket.save()
+                save_supply_lines(ticket, supply_lines)
 
 
 
-            scope = 'Group' if ticket.applies_to_group else 'Single printer'
+                scope = 'Group' if ticket.applies_to_group else 'Single printer'
 
-            _send_ticket_email(ticket, printer, scope)
+                _queue_ticket_email(ticket, printer, scope)
 
             return redirect(reverse('ticket_thanks'))
 
@@ -434,7 +582,7 @@ def printer_order(request, qr_token):
 
         form = SupplyRequestForm(printer=printer)
 
-        items_formset = InventorySupplyItemFormSet(prefix='items', initial=[{}], allowed_items_qs=allowed_items)
+        items_formset = InventorySupplyItemFormSet(prefix='items', initial=[{}], item_choices=item_choices)
 
 
 
@@ -453,7 +601,7 @@ def printer_order(request, qr_token):
         'form': form,
 
         'items_formset': items_formset,
-        'allowed_items': list(allowed_items),
+        'allowed_items': item_choices.items,
 
         'group_printers': group_printers,
 
@@ -493,22 +641,22 @@ def printer_paper_order(request, qr_token):
             ticket.applies_to_group = bool(target_group)
             ticket.group = target_group if target_group else None
 
-            extra = []
-            for idx, item in enumerate([item for item in items_formset.cleaned_data if item], start=1):
-                if not item:
-                    continue
-                item['supply_type'] = 'Copy paper (case)'
-                extra.append(f"Item {idx}: {item['supply_type']} (qty {item['supply_quantity']})")
+            # The paper form only orders cases of copy paper
+            paper_items = [{**item, 'supply_type': 'Copy paper (case)'} for item in items_formset.cleaned_data if item]
+            supply_lines = build_supply_lines(paper_items)
+            extra = describe_supply_lines(supply_lines)
 
             # Include drop-off location
             drop = (form.cleaned_data.get('drop_off_location') or '').strip()
             if drop:
                 extra.append(f"Drop-off location: {drop}")
             ticket.details = _combine_details(form.cleaned_data.get('details'), extra)
-            ticket.save()
+            with transaction.atomic():
+                ticket.save()
+                save_supply_lines(ticket, supply_lines)
 
-            scope_label = 'Group order' if ticket.applies_to_group else 'Single printer'
-            _send_ticket_email(ticket, printer, scope_label)
+                scope_label = 'Group order' if ticket.applies_to_group else 'Single printer'
+                _queue_ticket_email(ticket, printer, scope_label)
             messages.success(request, 'Paper order submitted to Printing Services.')
             return redirect('ticket_thanks')
     else:
@@ -549,7 +697,7 @@ def printer_issue(request, qr_token):
 
         if form.is_valid():
 
-            if _issue_rate_limit_reached(printer):
+            if _issue_rate_limit_reached(request, printer, form.cleaned_data.get('requester_email')):
 
                 return redirect(reverse('ticket_thanks'))
 
@@ -569,9 +717,10 @@ def printer_issue(request, qr_token):
 
             ticket.details = _combine_details(form.cleaned_data.get('details'), extra)
 
-            ticket.save()
+            with transaction.atomic():
+                ticket.save()
 
-            _send_ticket_email(ticket, printer, scope_label='Single printer')
+                _queue_ticket_email(ticket, printer, scope_label='Single printer')
 
             return redirect(reverse('ticket_thanks'))
 
@@ -609,29 +758,24 @@ def manager_dashboard(request):
     for g in groups:
         all_printers.extend(list(g.printers.all()))
     attach_status_to_printers(all_printers)
+    forecasts = supply_forecast_map(p.id for p in all_printers)
 
     status_payloads: list[dict] = []
-    attention_labels: list[str] = []
-    snmp_fault_labels: list[str] = []
 
     for group in groups:
         for printer in group.printers.all():
             status = getattr(printer, 'status_cached', None)
-            payload = build_status_payload(printer, status)
+            payload = build_status_payload(printer, status, forecasts=forecasts)
             status_payloads.append(payload)
             printer.status_payload = payload
 
-            status_data = payload.get('status', {})
-            if status_data.get('attention'):
-                attention_labels.append(payload['printer']['campus_label'])
-            if not status_data.get('snmp_ok', True):
-                snmp_fault_labels.append(payload['printer']['campus_label'])
-
-    attention_labels.sort()
-    snmp_fault_labels.sort()
-
     group_ids = [group.id for group in groups]
 
+    # Per-group counts are precomputed in FleetHealth
+    _, health_by_group = fleet_health(group_ids)
+    for group in groups:
+        group.health_summary = health_by_group.get(group.id)
+
     recent_issues = []
 
     if group_ids:
@@ -664,13 +808,9 @@ def manager_dashboard(request):
 
         'printer_status_payloads': status_payloads,
 
-        'attention_count': len(attention_labels),
+        'attention_count': sum(h.attention_count for h in health_by_group.values()),
 
-        'attention_labels': attention_labels,
-
-        'snmp_fault_count': len(snmp_fault_labels),
-
-        'snmp_fault_labels': snmp_fault_labels,
+        'snmp_fault_count': sum(h.fault_count for h in health_by_group.values()),
 
         'poll_interval_seconds': POLL_INTERVAL_SECONDS,
 
@@ -679,6 +819,110 @@ def manager_dashboard(request):
     return render(request, 'tickets/manager_dashboard.html', context)
 
 
+FORECAST_HORIZON_DAYS = 30
+
+
+@login_required
+@require_GET
+def manager_supply_forecast(request):
+    """Supplies forecast to run out soon (or already low) for the manager's printers.
+
+    Each row lists compatible inventory on hand so Printing Services can stage
+    toner before the device runs dry. ``?days=N`` changes the horizon.
+    """
+    try:
+        horizon_days = max(1, min(365, int(request.GET.get('days') or FORECAST_HORIZON_DAYS)))
+    except ValueError:
+        horizon_days = FORECAST_HORIZON_DAYS
+    cutoff = timezone.now() + timedelta(days=horizon_days)
+
+    readings = list(
+        SupplyReading.objects.filter(printer__group__managers=request.user)
+        .filter(Q(predicted_empty_at__lte=cutoff) | Q(percent__lte=LOW_SUPPLY_PERCENT))
+        .select_related('printer', 'printer__group')
+        .order_by(F('predicted_empty_at').asc(nulls_last=True), 'percent', 'printer__campus_label')
+    )
+
+    items_by_printer = compatible_items_by_printer({reading.printer_id for reading in readings})
+    for reading in readings:
+        reading.stock_items = match_stock_items(reading, items_by_printer.get(reading.printer_id, []))
+
+    return render(request, 'tickets/manager_forecast.html', {
+        'readings': readings,
+        'horizon_days': horizon_days,
+        'low_supply_percent': LOW_SUPPLY_PERCENT,
+    })
+
+
+AVAILABILITY_DEFAULT_DAYS = 30
+
+
+def _parse_window_bound(value: str, *, end: bool = False):
+    """Parse an ISO date or datetime; a bare ``end`` date covers that whole day."""
+    value = (value or '').strip()
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime.combine(day + timedelta(days=1) if end else day, datetime.min.time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+@login_required
+@require_GET
+def manager_availability(request):
+    """JSON availability report for the manager's printers and groups.
+
+    Optional GET params:
+    - start / end: ISO dates or datetimes (default: the last 30 days)
+    - group: restrict to one managed group id
+    """
+    try:
+        start = _parse_window_bound(request.GET.get('start'))
+        end = _parse_window_bound(request.GET.get('end'), end=True)
+    except ValueError as exc:
+        return JsonResponse({'error': 'invalid-date', 'value': str(exc)}, status=400)
+    default_start, default_end = default_window(AVAILABILITY_DEFAULT_DAYS)
+    start = start or (end - timedelta(days=AVAILABILITY_DEFAULT_DAYS) if end else default_start)
+    end = end or default_end
+    if end <= start:
+        return JsonResponse({'error': 'empty-window'}, status=400)
+
+    group_id = request.GET.get('group')
+    if group_id:
+        groups = [_get_managed_group(request.user, group_id)]
+    else:
+        groups = list(_managed_groups_queryset(request.user))
+    printers = [printer for group in groups for printer in group.printers.all()]
+    report = availability_report(printers, start, end)
+
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'groups': [
+            {
+                'id': group.id,
+                'name': group.name,
+                **report['groups'].get(group.id, {}),
+                'printers': [
+                    {
+                        'id': printer.id,
+                        'campus_label': printer.campus_label,
+                        **report['printers'][printer.id],
+                    }
+                    for printer in group.printers.all()
+                ],
+            }
+            for group in groups
+        ],
+    })
+
+
 
 
 
@@ -719,12 +963,11 @@ def manager_printer_order(request, printer_id):
 
 
     # Allowed inventory for this printer
-    allowed_items = InventoryItem.objects.filter(compatible_printers=printer).order_by('name').distinct()
-    allowed_map = {str(x.id): x for x in allowed_items}
+    item_choices = InventoryItemChoices(allowed_compatible_items([printer.pk]))
 
     if request.method == 'POST':
 
-        items_formset = InventorySupplyItemFormSet(request.POST, prefix='items', allowed_items_qs=allowed_items)
+        items_formset = InventorySupplyItemFormSet(request.POST, prefix='items', item_choices=item_choices)
 
         form = SupplyRequestForm(
 
@@ -756,23 +999,8 @@ def manager_printer_order(request, printer_id):
 
 
 
-            extra = []
-
-            for idx, item in enumerate([item for item in items_formset.cleaned_data if item], start=1):
-                if not item:
-                    continue
-                selected = item.get('supply_item')
-                qty = item.get('supply_quantity')
-                if selected == OTHER_SENTINEL:
-                    other_text = (item.get('supply_other') or '').strip() or 'unspecified'
-                    extra.append(f"Item {idx}: Other / Not listed â€” {other_text} (qty {qty})")
-                else:
-                    inv = allowed_map.get(str(selected))
-                    if inv:
-                        label = f"{inv.name} ({inv.category})"
-                        if inv.model_number:
-                            label += f" [{inv.model_number}]"
-                        extra.append(f"Item {idx}: {label} (qty {qty})")
+            supply_lines = build_supply_lines(items_formset.cleaned_data, item_choices)
+            extra = describe_supply_lines(supply_lines)
 
             if ticket.applies_to_group and ticket.group:
 
@@ -784,13 +1012,15 @@ def manager_printer_order(request, printer_id):
 
             ticket.details = _combine_details(form.cleaned_data.get('details'), extra)
 
-            ticket.save()
+            with transaction.atomic():
+                ticket.save()
+                save_supply_lines(ticket, supply_lines)
 
 
 
-            scope = 'Group' if ticket.applies_to_group else 'Single printer'
+                scope = 'Group' if ticket.applies_to_group else 'Single printer'
 
-            _send_ticket_email(ticket, printer, scope)
+                _queue_ticket_email(ticket, printer, scope)
 
             messages.success(request, 'Supply order submitted to Printing Services.')
 
@@ -810,7 +1040,7 @@ def manager_printer_order(request, printer_id):
 
         )
 
-        items_formset = InventorySupplyItemFormSet(prefix='items', initial=[{}], allowed_items_qs=allowed_items)
+        items_formset = InventorySupplyItemFormSet(prefix='items', initial=[{}], item_choices=item_choices)
 
 
 
@@ -827,7 +1057,7 @@ def manager_printer_order(request, printer_id):
         'form': form,
 
         'items_formset': items_formset,
-        'allowed_items': list(allowed_items),
+        'allowed_items': item_choices.items,
 
         'group_printers': list(printer.group.printers.order_by('campus_label')) if printer.group else None,
 
@@ -873,12 +1103,11 @@ def _handle_group_order_request(request, group: PrinterGroup, items_initial=None
 
     # Allowed inventory for any printer within the group
     group_printers_qs = group.printers.all()
-    allowed_items = InventoryItem.objects.filter(compatible_printers__in=group_printers_qs).order_by('name').distinct()
-    allowed_map = {str(x.id): x for x in allowed_items}
+    item_choices = InventoryItemChoices(allowed_compatible_items([p.pk for p in group_printers_qs]))
 
     if request.method == 'POST':
 
-        items_formset = InventorySupplyItemFormSet(request.POST, prefix='items', allowed_items_qs=allowed_items)
+        items_formset = InventorySupplyItemFormSet(request.POST, prefix='items', item_choices=item_choices)
 
         form = SupplyRequestForm(
 
@@ -908,23 +1137,8 @@ def _handle_group_order_request(request, group: PrinterGroup, items_initial=None
 
 
 
-            extra = []
-
-            for idx, item in enumerate([item for item in items_formset.cleaned_data if item], start=1):
-                if not item:
-                    continue
-                selected = item.get('supply_item')
-                qty = item.get('supply_quantity')
-                if selected == OTHER_SENTINEL:
-                    other_text = (item.get('supply_other') or '').strip() or 'unspecified'
-                    extra.append(f"Item {idx}: Other / Not listed â€” {other_text} (qty {qty})")
-                else:
-                    inv = allowed_map.get(str(selected))
-                    if inv:
-                        label = f"{inv.name} ({inv.category})"
-                        if inv.model_number:
-                            label += f" [{inv.model_number}]"
-                        extra.append(f"Item {idx}: {label} (qty {qty})")
+            supply_lines = build_supply_lines(items_formset.cleaned_data, item_choices)
+            extra = describe_supply_lines(supply_lines)
 
             group_name = group.name or 'group'
 
@@ -938,11 +1152,13 @@ def _handle_group_order_request(request, group: PrinterGroup, items_initial=None
                 extra.append(f"Drop-off location: {drop}")
             ticket.details = _combine_details(form.cleaned_data.get('details'), extra)
 
-            ticket.save()
+            with transaction.atomic():
+                ticket.save()
+                save_supply_lines(ticket, supply_lines)
 
 
 
-            _send_ticket_email(ticket, primary_printer, scope_label='Group order')
+                _queue_ticket_email(ticket, primary_printer, scope_label='Group order')
 
             messages.success(request, success_message)
 
@@ -952,7 +1168,7 @@ def _handle_group_order_request(request, group: PrinterGroup, items_initial=None
 
         initial_items = items_initial if items_initial is not None else [{}]
 
-        items_formset = InventorySupplyItemFormSet(prefix='items', initial=initial_items, allowed_items_qs=allowed_items)
+        items_formset = InventorySupplyItemFormSet(prefix='items', initial=initial_items, item_choices=item_choices)
 
         form = SupplyRequestForm(
 
@@ -983,7 +1199,7 @@ def _handle_group_order_request(request, group: PrinterGroup, items_initial=None
         'form': form,
 
         'items_formset': items_formset,
-        'allowed_items': list(allowed_items),
+        'allowed_items': item_choices.items,
 
         'group_printers': list(group.printers.order_by('campus_label')),
 
@@ -1071,7 +1287,7 @@ def manager_printer_issue(request, printer_id):
 
         if form.is_valid():
 
-            if _issue_rate_limit_reached(printer):
+            if _issue_rate_limit_reached(request, printer, form.cleaned_data.get('requester_email')):
 
                 messages.success(request, 'Issue reported to Printing Services.')
 
@@ -1093,9 +1309,10 @@ def manager_printer_issue(request, printer_id):
 
             ticket.details = _combine_details(form.cleaned_data.get('details'), extra)
 
-            ticket.save()
+            with transaction.atomic():
+                ticket.save()
 
-            _send_ticket_email(ticket, printer, scope_label='Single printer')
+                _queue_ticket_email(ticket, printer, scope_label='Single printer')
 
             messages.success(request, 'Issue reported to Printing Services.')
 